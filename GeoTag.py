@@ -1,6 +1,6 @@
 
 import xml.etree.ElementTree as ET
-from toolkit import collector, attributer, np, re
+from toolkit import collector, attributer, np, cv, re
 
 class GeoTag(collector, attributer):
     _svg_attribs = ['stroke', 'stroke-width', 'fill']  # Add SVG attributes
@@ -258,8 +258,17 @@ class Point3D(object):
     def k(cls):
         return cls(0, 0, 1)
     
+def xyz_to_coord(xyz):
+    """Convert an (..., 3) array of unit vectors into longitude and latitude arrays in degrees."""
+    xyz = np.asarray(xyz, dtype=float)
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    lon = np.degrees(np.arctan2(z, x))
+    lat = np.degrees(np.arctan2(y, np.hypot(x, z)))
+    return lon, lat
+
 class CoordinatePoint(Point3D):
-    def __init__(self, long, lat):
+    # Defaults let the GeoTag mixins' cooperative __init__ chain reach this class in GeoPoint
+    def __init__(self, long=0.0, lat=0.0):
         x = np.cos(np.radians(lat)) * np.cos(np.radians(long))
         y = np.sin(np.radians(lat))
         z = np.cos(np.radians(lat)) * np.sin(np.radians(long))
@@ -267,7 +276,7 @@ class CoordinatePoint(Point3D):
     
     @classmethod
     def from_point(cls, point):
-        return cls(np.degree(point.theta), np.degree(point.phi))
+        return cls(np.degrees(point.theta), np.degrees(point.phi))
     
     @property
     def longitude(self):
@@ -419,29 +428,59 @@ class CoordinateList:
     def __repr__(self):
         return f"CoordinateList({self._points})"
     
+    def xyz_array(self):
+        """Get the points of the list as an (N, 3) array of unit vectors."""
+        if not self._points:
+            return np.empty((0, 3))
+        return np.array([point._arg for point in self._points])
+    
+    def coordinates(self):
+        """Get longitude and latitude arrays, in degrees, for all the points in the list."""
+        return xyz_to_coord(self.xyz_array())
+    
     def path_list(self, projection=None, precision=None):
-        if projection is None:
-            projection = lambda p: (p.longitude, p.latitude)
         format_str = "{},{}" if precision is None else "{{:.{}f}},{{:.{}f}}".format(precision, precision)
         
-        coordinates = []
-        for point in self._points:
-            lon, lat = projection(point)
-            coordinates.append(format_str.format(lon, lat))
+        breaks = None
+        if projection is None:
+            xs, ys = self.coordinates()
+        elif hasattr(projection, 'project_path'):
+            # Project the whole ring in a single pass, only as exactly as the path is written out
+            tolerance = None if precision is None else 0.5 * 10.0 ** -precision
+            xs, ys, breaks = projection.project_path(self.xyz_array(), tolerance=tolerance)
+        else:
+            xs, ys = zip(*[projection(point) for point in self._points]) if self._points else ((), ())
         
-        return "M " + " ".join(coordinates) + (" Z" if self.closed else "")
+        # A segment is drawn into each visible point from a visible previous one, unless the projection breaks it
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        visible = np.isfinite(xs) & np.isfinite(ys)
+        drawn = visible & np.roll(visible, 1)
+        if breaks is not None:
+            drawn &= ~np.asarray(breaks, dtype=bool)
+        if drawn.all() or (not self.closed and drawn[1:].all()):
+            coordinates = map(format_str.format, xs.tolist(), ys.tolist())
+            return "M " + " ".join(coordinates) + (" Z" if self.closed else "")
+
+        # Hidden points and breaks split the path into open runs
+        if self.closed:
+            # Start on a break so no run wraps around the end of the ring
+            start = np.argmin(drawn)
+            xs, ys, visible, drawn = (np.roll(a, -start) for a in (xs, ys, visible, drawn))
+        drawn[0] = False
+        runs = np.split(np.arange(len(xs)), np.flatnonzero(~drawn)[1:])
+        return " ".join("M " + " ".join(map(format_str.format, xs[run].tolist(), ys[run].tolist()))
+                        for run in runs if visible[run[0]])
     
     def kml_list(self, separator=' ', lon_precision=None, lat_precision=None):
         format_str = CoordinatePoint.kml_format(lon_precision, lat_precision)
         
-        items = []
-        for point in self._points:
-            item_str = format_str.format(point.longitude, point.latitude)
-            items.append(item_str)
-        if self.closed:
-            items.append(format_str.format(self._points[0].longitude, self._points[0].latitude))
+        lons, lats = self.coordinates()
+        lons, lats = lons.tolist(), lats.tolist()
+        if self.closed and lons:
+            lons.append(lons[0])
+            lats.append(lats[0])
         
-        return separator.join(items)
+        return separator.join(map(format_str.format, lons, lats))
     
     def normal(self):
         points = self._points + [self._points[0]] if self.closed else self._points
@@ -465,8 +504,9 @@ class CoordinateList:
             crosses.append(crosses[0])
         arg = 0
         for i in range(len(crosses) - 1):
-            arg += reference.dot(crosses[i].cross(crosses[i + 1])) / (crosses[i].dot(crosses[i + 1]))
-        return arg / reference.square()
+            # Signed turn between consecutive points as seen from reference
+            arg += np.arctan2(reference.dot(crosses[i].cross(crosses[i + 1])) / abs(reference), crosses[i].dot(crosses[i + 1]))
+        return arg
     
     def orientation(self):
         arg = self.argument()
@@ -493,6 +533,9 @@ class GeoPoint(GeoTag, CoordinatePoint):
         if projection is None:
             projection = lambda p: (p.longitude, p.latitude)
         lon, lat = projection(self)
+        if np.isnan(lon) or np.isnan(lat):
+            # Hidden by the projection, as on the far side of a globe
+            return None
         kwargs['cx'] = lon
         kwargs['cy'] = lat
         kwargs['r'] = kwargs.pop('radius', '3')
@@ -587,7 +630,7 @@ class GeoComposite(GeoTag):
         return self._polygons[index]
     
     def __iter__(self):
-        return self._polygons
+        return iter(self._polygons)
     
     def __append__(self, polygon):
         if len(polygon) == 0:
@@ -639,6 +682,7 @@ class GeoGroup(GeoTag):
         """Initialize a GeoGroup."""
         super().__init__(name, id, description)
         self._elements = []
+        self._labels = None
     
     def __len__(self):
         """Get the number of elements in the group."""
@@ -661,17 +705,104 @@ class GeoGroup(GeoTag):
         if not isinstance(element, GeoTag):
             raise TypeError("Only instances of GeoTag can be added to a GeoGroup")
         self._elements.append(element)
+        self._labels = None
     
     def remove_element(self, element):
         """Remove a GeoTag element from the group."""
         if element in self._elements:
             self._elements.remove(element)
+            self._labels = None
+    
+    def points(self):
+        """Get every GeoPoint in the group and its subgroups, in document order."""
+        points = []
+        for element in self._elements:
+            if isinstance(element, GeoPoint):
+                points.append(element)
+            elif isinstance(element, GeoGroup):
+                points.extend(element.points())
+        return points
+    
+    def point_coordinates(self):
+        """Get longitude and latitude arrays, in degrees, for every GeoPoint in the group."""
+        points = self.points()
+        return xyz_to_coord(np.array([point._arg for point in points]) if points else np.empty((0, 3)))
+    
+    def zones(self):
+        """Get every GeoComposite and outer GeoPolygon in the group and its subgroups, in document order."""
+        zones = []
+        for element in self._elements:
+            if isinstance(element, GeoComposite) or (isinstance(element, GeoPolygon) and not element.inner):
+                zones.append(element)
+            elif isinstance(element, GeoGroup):
+                zones.extend(element.zones())
+        return zones
+    
+    def label_grid(self, map_image):
+        """Rasterize the zones once into an int32 grid aligned with map_image: 0 outside them, i + 1 in zone i."""
+        zones = self.zones()
+        # Subgroups can change under the group, so the grid is kept for one source and zone list
+        key = (map_image.source_key,) + tuple(map(id, zones))
+        if self._labels is not None and self._labels[0] == key:
+            return self._labels[2]
+        labels = np.zeros(map_image.shape[:2], dtype=np.int32)
+        for label, zone in enumerate(zones, 1):
+            outers = [zone] if isinstance(zone, GeoPolygon) else [polygon for polygon in zone if not polygon.inner]
+            for outer in outers:
+                # Holes are the inner polygons the composite filed under their outer one
+                rings = [outer] + list(outer._children or [])
+                _fill_rings(labels, label, [map_image.coord_to_image(*ring.coordinates()) for ring in rings], map_image.wraps)
+        # The zones are held with the grid so their ids are not reused while it is cached
+        self._labels = (key, zones, labels)
+        return labels
+    
+    def zonal_stats(self, map_image, stats=('count', 'sum', 'mean')):
+        """Statistics of map_image over each zone, from one bincount pass over the label grid.
+        
+        stats are any of count, sum, mean, std, min and max. Returns a dict of
+        arrays with a value, or one per channel, for each zone of zones() in order;
+        empty zones get NaN means and extremes.
+        """
+        labels = self.label_grid(map_image)
+        zones = len(self.zones()) + 1
+        channels = range(int(np.prod(map_image.shape[2:], dtype=int)))
+        count = np.zeros(zones)
+        total = np.zeros((zones, len(channels)))
+        squares = np.zeros_like(total)
+        extremes = {name: np.full((zones, len(channels)), np.nan) for name in ('min', 'max') if name in stats}
+        # Tiled sources are summed up one tile at a time
+        for top, left, image in map_image.blocks():
+            block = labels[top:top + image.shape[0], left:left + image.shape[1]].ravel()
+            values = image.reshape(block.size, -1)
+            count += np.bincount(block, minlength=zones)
+            for c in channels:
+                total[:, c] += np.bincount(block, weights=values[:, c], minlength=zones)
+                if 'std' in stats:
+                    squares[:, c] += np.bincount(block, weights=np.square(values[:, c], dtype=float), minlength=zones)
+            if extremes:
+                # Extremes from one sort by label, reduced over each zone's run
+                order = np.argsort(block, kind='stable')
+                present, starts = np.unique(block[order], return_index=True)
+                ordered = values[order]
+                for name, reduce, merge in (('min', np.minimum, np.fmin), ('max', np.maximum, np.fmax)):
+                    if name in extremes:
+                        extremes[name][present] = merge(extremes[name][present], reduce.reduceat(ordered, starts, axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count[:, np.newaxis]
+        result = {'count': np.broadcast_to(count[:, np.newaxis], total.shape), 'sum': total, 'mean': mean, **extremes}
+        if 'std' in stats:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result['std'] = np.sqrt(np.maximum(squares / count[:, np.newaxis] - mean * mean, 0))
+        shape = map_image.shape[2:]
+        return {name: result[name][1:].reshape((zones - 1,) + shape) for name in stats}
     
     def as_svg(self, projection=None, **kwargs):
         """Generate SVG representation of the group."""
         svg_group = self.svg_element('g', **kwargs)
         for element in self._elements:
-            svg_group.append(element.as_svg(projection=projection))
+            element = element.as_svg(projection=projection)
+            if element is not None:
+                svg_group.append(element)
         return svg_group
     
     def as_kml(self, **kwargs):
@@ -681,6 +812,42 @@ class GeoGroup(GeoTag):
             folder.append(element.as_kml())
         return folder
 
+def _fill_rings(labels, label, rings, wraps, shift=8):
+    """Paint label over an outer ring minus its holes, given as source pixel (x, y) arrays."""
+    height, width = labels.shape
+    polygons = []
+    for x, y in rings:
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        if wraps and len(x):
+            # Unwrap across the antimeridian; a ring that drifts a whole turn goes round a pole
+            closed = np.unwrap(np.append(x, x[0]), period=width)
+            x, y = closed[:-1], y
+            if abs(closed[-1] - closed[0]) > width / 2:
+                pole = 0 if y.mean() < height / 2 else height - 1
+                x = np.append(closed, [closed[-1], closed[0]])
+                y = np.append(y, [y[0], pole, pole])
+            if polygons:
+                # Keep holes on the same turn as their outer ring
+                x -= width * np.round((x.mean() - polygons[0][0].mean()) / width)
+        polygons.append((x, y))
+    if not len(polygons[0][0]):
+        return
+    x, y = polygons[0]
+    x0, x1 = int(np.floor(x.min())), int(np.ceil(x.max())) + 1
+    y0, y1 = max(0, int(np.floor(y.min()))), min(height, int(np.ceil(y.max())) + 1)
+    if not wraps:
+        x0, x1 = max(0, x0), min(width, x1)
+    if x0 >= x1 or y0 >= y1:
+        return
+    mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    for value, (x, y) in zip([1] + [0] * (len(polygons) - 1), polygons):
+        points = np.round(np.stack([x - x0, y - y0], axis=-1) * (1 << shift)).astype(np.int32)
+        cv.fillPoly(mask, [points.reshape(-1, 1, 2)], value, shift=shift)
+    columns = np.arange(x0, x1) % width
+    block = labels[y0:y1, columns]
+    block[mask.astype(bool)] = label
+    labels[y0:y1, columns] = block
+
 class GeoDocument(GeoGroup):
     """Class representing a GeoDocument, which is the base group for geographical elements."""
     
@@ -692,7 +859,9 @@ class GeoDocument(GeoGroup):
         """Generate SVG representation of the document."""
         svg_document = self.svg_element('svg', **kwargs)
         for element in self._elements:
-            svg_document.append(element.as_svg(projection=projection))
+            element = element.as_svg(projection=projection)
+            if element is not None:
+                svg_document.append(element)
         return svg_document
     
     def as_kml(self, **kwargs):
@@ -1,30 +1,166 @@
 
-from toolkit import cv
+from toolkit import cv, bytecache
 from GeoTag import *
 from mysvgbin import SVGbin
-import base64
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import base64, collections, copy, hashlib, json, os, struct, warnings
 
 class MapImage:
     _behaviors = ['nearest', 'bilinear', 'bicubic']
+    _flags = {'nearest': cv.INTER_NEAREST, 'bilinear': cv.INTER_LINEAR, 'bicubic': cv.INTER_CUBIC}
+    # Fixed-point remap tables hold coordinates as int16
+    _fixed_limit = 32767
+    # Decoded source tiles, shared by every tiled image in the process
+    _tile_cache = bytecache(1 << 30)
+    # Neighbour pixels copied around a tile, enough for bicubic sampling
+    _tile_margin = 2
+    # Decoders scale JPEG sources down in the DCT, at a fraction of the full decode
+    _reduced_flags = {1: cv.IMREAD_COLOR, 2: cv.IMREAD_REDUCED_COLOR_2, 4: cv.IMREAD_REDUCED_COLOR_4, 8: cv.IMREAD_REDUCED_COLOR_8}
 
-    def __init__(self, image_path, central_meridian=0.0, interpolation=cv.INTER_NEAREST):
-        self._image = cv.imread(image_path)
-        if self._image is None:
-            raise FileNotFoundError(f"Unable to open image file: {image_path}")
+    def __init__(self, image_path, central_meridian=0.0, interpolation=cv.INTER_NEAREST, pixels_per_degree=None, unchanged=False, projection=None):
+        image, tiles, reduction = None, None, 1
+        if os.path.isdir(image_path) or image_path.lower().endswith('.json'):
+            tiles = self.read_manifest(image_path)
+        elif image_path.lower().endswith('.npy'):
+            image = self.open_raw(image_path)
+        else:
+            image, reduction = self.read_image(image_path, pixels_per_degree, unchanged,
+                                               Projection[projection] if isinstance(projection, str) else projection)
+        self._setup(image, image_path, central_meridian, interpolation, tiles, reduction)
+        if isinstance(projection, str):
+            # The source raster covers the whole map of its projection, in normal aspect: a private
+            # copy sized to the raster, so views set on the registered projection do not move it
+            height, width = self.shape[:2]
+            projection = Projection[projection].detached(map_size=(width, height), window_size=None, window_offset=(0, 0),
+                                                         central_meridian=central_meridian, central_latitude=0.0, viewpoint_azimuth=0.0)
+        # Equirectangular by default
+        self._projection = projection
+    
+    def _setup(self, image, path, central_meridian=0.0, interpolation=cv.INTER_NEAREST, tiles=None, reduction=1):
+        # The state every source holds, however it was made
+        self._image = image
+        self._tiles = tiles
+        self._reduction = reduction
+        self._path = path
         self._central_meridian = central_meridian
         self._interpolation = interpolation
+        self._pyramid = None
+        self._cube = None
+        self._projection = None
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if isinstance(self._image, np.memmap):
+            # Worker processes map the raw file again rather than receiving a copy
+            state['_image'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._image is None and self._tiles is None:
+            self._image = self.open_raw(self._path)
+    
+    def geometry(self):
+        """A copy of the source without its pixels, enough to build remap tables in worker processes."""
+        standin = copy.copy(self)
+        if self._tiles is None:
+            standin._image = _ImageGeometry(self.shape, self.dtype)
+        standin._pyramid = standin._cube = None
+        return standin
+    
+    @property
+    def path(self):
+        return self._path
+    
+    @property
+    def reduction(self):
+        """Scale divisor the source was decoded at."""
+        return self._reduction
+    
+    @staticmethod
+    def is_jpeg(image_path):
+        """Whether a file starts with the JPEG start of image marker."""
+        try:
+            with open(image_path, 'rb') as f:
+                return f.read(2) == b'\xff\xd8'
+        except OSError:
+            return False
+    
+    @staticmethod
+    def image_size(image_path):
+        """Read (width, height) from a PNG or JPEG header without decoding, or None for other files."""
+        try:
+            with open(image_path, 'rb') as f:
+                head = f.read(24)
+                if head[:8] == b'\x89PNG\r\n\x1a\n':
+                    return struct.unpack('>II', head[16:24])
+                if head[:2] != b'\xff\xd8':
+                    return None
+                f.seek(2)
+                while True:
+                    marker = f.read(4)
+                    if len(marker) < 4 or marker[0] != 0xFF:
+                        return None
+                    # Start of frame markers, leaving out DHT, JPG and DAC
+                    if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                        height, width = struct.unpack('>xHH', f.read(5))
+                        return width, height
+                    f.seek(struct.unpack('>H', marker[2:])[0] - 2, 1)
+        except OSError:
+            return None
+    
+    @classmethod
+    def read_image(cls, image_path, pixels_per_degree=None, unchanged=False, projection=None):
+        """Decode an image file, at 1/2, 1/4 or 1/8 scale when that still leaves pixels_per_degree source pixels per degree.
+        
+        The source is equirectangular unless its projection is given. Only JPEG files
+        are reduced, as their decoder averages blocks instead of decoding in full and
+        dropping pixels. Unchanged images keep their channels and bit depth, and are
+        always decoded in full.
+        Returns the image and the reduction factor.
+        """
+        reduction = 1
+        size = cls.image_size(image_path) if pixels_per_degree and not unchanged and cls.is_jpeg(image_path) else None
+        if size:
+            if projection is None:
+                density = min(size[0] / 360, size[1] / 180)
+            else:
+                density = projection.detached(map_size=size, window_size=None).max_pixels_per_degree()
+            reduction = max((factor for factor in cls._reduced_flags if density >= factor * pixels_per_degree), default=1)
+        image = cv.imread(image_path, cv.IMREAD_UNCHANGED if unchanged else cls._reduced_flags[reduction])
+        if image is None:
+            raise FileNotFoundError(f"Unable to open image file: {image_path}")
+        return image, reduction
+    
     @property
     def image(self):
+        """The whole source image; tiled sources are worked through blocks(), or assembled on request by mosaic()."""
+        if self._tiles is not None:
+            raise ValueError(f"Tiled source {self._path} is not held as one image: use blocks() or mosaic()")
         return self._image
     
+    @property
+    def shape(self):
+        if self._tiles is None:
+            return self._image.shape
+        channels = self._tiles['channels']
+        return (self._tiles['height'], self._tiles['width']) + ((channels,) if channels > 1 else ())
+    
+    @property
+    def dtype(self):
+        return self._image.dtype if self._tiles is None else np.dtype(self._tiles['dtype'])
+    
+    @property
+    def tiled(self):
+        return self._tiles is not None
+    
     @property
     def central_meridian(self):
         return self._central_meridian
     
     @property
     def interpolation(self):
-        return self._behavior
+        return self._interpolation
     
     @central_meridian.setter
     def central_meridian(self, value):
@@ -34,9 +170,32 @@ class MapImage:
     @interpolation.setter
     def interpolation(self, value):
         self._interpolation = value
+    
+    @property
+    def projection(self):
+        return self._projection
+    
+    @property
+    def wraps(self):
+        """Whether the source columns go round the globe, so sampling wraps at the left and right edges."""
+        return self._projection is None or self._projection._separable
+    
+    @property
+    def border(self):
+        """OpenCV border mode for samples off the source: wrapped round the globe, or blank."""
+        return cv.BORDER_WRAP if self.wraps else cv.BORDER_CONSTANT
+    
+    def separable(self):
+        """Whether source columns only depend on longitude and rows only on latitude."""
+        return self._projection is None or self._projection.separable()
 
     def coord_to_image(self, lon, lat):
-        height, width = self.image.shape[:2]
+        height, width = self.shape[:2]
+        if self._projection is not None:
+            # Forward source projection, from its map size to the decoded image
+            x, y = self._projection.project_array(lon, lat)
+            map_width, map_height = self._projection.plan.map_size
+            return x * (width / map_width), y * (height / map_height)
         lon_normalized = ((lon - self.central_meridian + 180) / 360) % 1
         lat_normalized = (90 - lat) / 180
         x = lon_normalized * width
@@ -44,31 +203,871 @@ class MapImage:
         return x, y
 
     def spatial_to_coord(self, point: np.ndarray):
-        lon = np.degrees(np.arctan2(point[..., 0], point[..., 2]))
-        lat = np.degrees(np.arctan2(point[..., 1], np.sqrt(point[..., 0]**2 + point[..., 2]**2)))
-        return lon, lat
+        return xyz_to_coord(point)
     
     def spatial_to_image(self, point: np.ndarray):
-        lon = np.degrees(np.arctan2(point[..., 0], point[..., 2]))
-        lat = np.degrees(np.arctan2(point[..., 1], np.sqrt(point[..., 0]**2 + point[..., 2]**2)))
-        return self.coord_to_image(lon, lat)
+        return self.coord_to_image(*xyz_to_coord(point))
+    
+    def image_tables(self, point: np.ndarray):
+        """Build float32 (map_x, map_y) remap tables for an (..., 3) xyz grid."""
+        return self.coord_tables(*xyz_to_coord(point))
+    
+    def coord_tables(self, lon, lat):
+        """Build float32 (map_x, map_y) remap tables from longitude and latitude grids in degrees.
+        
+        float32 grids are converted in place and returned as the tables.
+        """
+        height, width = self.shape[:2]
+        if self._projection is not None:
+            x, y = self.coord_to_image(lon, lat)
+            map_x, map_y = x.astype(np.float32), y.astype(np.float32)
+            if self.wraps:
+                np.clip(map_y, 0, height - 1, out=map_y)
+            return map_x, map_y
+        map_x = np.asarray(lon, dtype=np.float32)
+        map_x -= self.central_meridian - 180
+        map_x *= 1 / 360
+        np.mod(map_x, 1, out=map_x)
+        map_x *= width
+        map_y = np.asarray(lat, dtype=np.float32)
+        map_y *= -height / 180
+        map_y += height / 2
+        # Rows wrap too under BORDER_WRAP, so keep them off the far pole
+        np.clip(map_y, 0, height - 1, out=map_y)
+        return map_x, map_y
+    
+    def separable_tables(self, lon, lat):
+        """Build float32 remap tables from per-column longitudes and per-row latitudes by broadcasting."""
+        x, _ = self.coord_to_image(np.asarray(lon, dtype=float), 0.0)
+        _, y = self.coord_to_image(0.0, np.asarray(lat, dtype=float))
+        map_x = np.empty((len(lat), len(lon)), dtype=np.float32)
+        map_y = np.empty_like(map_x)
+        map_x[...] = x
+        map_y[...] = np.clip(y, 0, self.shape[0] - 1)[:, np.newaxis]
+        return map_x, map_y
+    
+    def interpolation_flag(self, interpolation=None):
+        """Get the OpenCV flag for an interpolation given by name, flag or the image default."""
+        interpolation = self._interpolation if interpolation is None else interpolation
+        return self._flags[interpolation] if isinstance(interpolation, str) else int(interpolation)
+    
+    def fixed_tables(self, tables, interpolation=None):
+        """Convert float32 remap tables into faster CV_16SC2 fixed-point tables for repeated use."""
+        if self.tiled or max(self.shape[:2]) >= self._fixed_limit:
+            return tables
+        nearest = self.interpolation_flag(interpolation) == cv.INTER_NEAREST
+        return cv.convertMaps(tables[0], tables[1], cv.CV_16SC2, nninterpolation=nearest)
+    
+    @property
+    def source_key(self):
+        """Everything about the source that remap tables depend on."""
+        if self._projection is not None:
+            return (self.shape[:2], self._projection.plan.key)
+        return (self.shape[:2], float(self.central_meridian))
+    
+    def cube_map(self, face_size=None):
+        """Get the source resampled into a cube map, converting it on first use."""
+        if self._cube is None or (face_size and self._cube.face_size != face_size):
+            self._cube = CubeMapImage(self, face_size)
+        return self._cube
+    
+    def rescale_tables(self, tables, source):
+        """Float32 tables for this image from the tables of a co-registered source of another size."""
+        if self.shape[:2] == source.shape[:2]:
+            return tables
+        height, width = self.shape[:2]
+        map_x = tables[0] * np.float32(width / source.shape[1])
+        map_y = tables[1] * np.float32(height / source.shape[0])
+        np.clip(map_y, 0, height - 1, out=map_y)
+        return map_x, map_y
     
     def get_value(self, point, interpolation=None):
-        interpolation = interpolation or self._interpolation
-        x, y = point[..., 0], point[..., 1]
-        interp_value = cv.remap(self.image, np.array([x]), np.array([y]), interpolation)
-        return interp_value
+        point = np.asarray(point)
+        shape = point.shape[:-1]
+        values = self._sample_points(point[..., 0].ravel(), point[..., 1].ravel(), self.interpolation_flag(interpolation))
+        return values.reshape(shape + values.shape[1:])
+    
+    # Points converted and sampled at a time by sample_points
+    _point_chunk = 1 << 20
+    
+    def sample_points(self, lon, lat=None, interpolation=None, chunk=None, dst=None):
+        """Sample the source at longitude and latitude arrays in degrees, or at every GeoPoint of a GeoGroup.
+        
+        Coordinates go through coord_to_image and cv.remap chunk points at a time,
+        so memory-mapped inputs, and a memory-mapped dst, may exceed memory.
+        Returns values shaped like the coordinates, plus the source channels.
+        """
+        if lat is None:
+            lon, lat = lon.point_coordinates()
+        lon, lat = np.broadcast_arrays(lon, lat)
+        flag = self.interpolation_flag(interpolation)
+        chunk = chunk or self._point_chunk
+        output = np.empty(lon.shape + self.shape[2:], dtype=self.dtype) if dst is None else dst
+        flat_lon, flat_lat = lon.reshape(-1), lat.reshape(-1)
+        flat = output.reshape((-1,) + self.shape[2:])
+        for start in range(0, flat_lon.size, chunk):
+            stop = start + chunk
+            x, y = self.coord_to_image(np.asarray(flat_lon[start:stop], dtype=float), np.asarray(flat_lat[start:stop], dtype=float))
+            if self.wraps:
+                # Keep the south pole off the wrapped first row
+                y = np.clip(y, 0, self.shape[0] - 1)
+            flat[start:stop] = self._sample_points(np.ravel(x), np.ravel(y), flag)
+        return output
+    
+    # cv.remap only takes maps narrower than SHRT_MAX
+    _remap_block = 4096
+    
+    @classmethod
+    def _remap_points(cls, image, x, y, flag, border=cv.BORDER_WRAP):
+        # cv.remap over flat coordinate arrays, folded into rows of at most _remap_block points
+        count = x.size
+        columns = max(1, min(count, cls._remap_block))
+        rows = -(-count // columns)
+        padding = (0, rows * columns - count)
+        x = np.pad(np.asarray(x, dtype=np.float32), padding).reshape(rows, columns)
+        y = np.pad(np.asarray(y, dtype=np.float32), padding).reshape(rows, columns)
+        values = cv.remap(image, x, y, flag, borderMode=border)
+        return values.reshape((-1,) + image.shape[2:])[:count]
+    
+    def _sample_points(self, x, y, flag):
+        if self._tiles is None:
+            return self._remap_points(self._image, x, y, flag, self.border)
+        return self._sample_tiles(x, y, flag)
+    
+    def sample(self, tables, interpolation=None, dst=None, mask=None):
+        """Sample the image through float32 or fixed-point remap tables, wrapping around the antimeridian if the source does.
+        
+        With a boolean mask, only the output pixels inside it are sampled and the rest are zero.
+        """
+        map1, map2 = tables
+        flag = self.interpolation_flag(interpolation)
+        if mask is not None:
+            return self._sample_masked(map1, map2, flag, mask, dst)
+        if self._tiles is None:
+            return cv.remap(self._image, map1, map2, flag, dst=dst, borderMode=self.border)
+        values = self._sample_tiles(map1.ravel(), map2.ravel(), flag).reshape(map1.shape + self.shape[2:])
+        if dst is None:
+            return values
+        dst[...] = values
+        return dst
+    
+    # Output rows per remap call when sampling through a mask
+    _mask_band = 16
+    
+    def _sample_masked(self, map1, map2, flag, mask, dst=None):
+        # Remap each band of rows over the columns its mask spans, then clear the pixels off the mask
+        output = np.zeros(mask.shape + self.shape[2:], dtype=self.dtype) if dst is None else dst
+        if self._tiles is not None:
+            output[~mask] = 0
+            output[mask] = self._sample_tiles(map1[mask], map2[mask], flag)
+            return output
+        for top in range(0, mask.shape[0], self._mask_band):
+            band = mask[top:top + self._mask_band]
+            out = output[top:top + self._mask_band]
+            columns = np.flatnonzero(band.any(axis=0))
+            if not len(columns):
+                out[...] = 0
+                continue
+            left, right = columns[0], columns[-1] + 1
+            out[:, :left] = 0
+            out[:, right:] = 0
+            values = cv.remap(self._image, map1[top:top + self._mask_band, left:right], map2[top:top + self._mask_band, left:right],
+                              flag, borderMode=self.border)
+            # A masked AND zeroes the pixels off the mask in one pass
+            values = cv.bitwise_and(values, values, mask=np.ascontiguousarray(band[:, left:right]).view(np.uint8))
+            out[:, left:right] = values.reshape(out[:, left:right].shape)
+        return output
+    
+    def regrid(self, weights, shape, dst=None):
+        """Area-weighted resampling into an image of the given (height, width) through sparse (rows, columns, weights).
+        
+        One sparse matrix-vector product, as a weighted bincount, per channel;
+        tiled sources add up the products over the tiles the weights reach.
+        """
+        rows, columns, values = weights
+        count = shape[0] * shape[1]
+        channels = int(np.prod(self.shape[2:], dtype=int))
+        total = np.zeros((count, channels))
+        for image, selection, cells in self._cell_blocks(columns):
+            source = image.reshape(-1, channels)
+            for channel in range(channels):
+                total[:, channel] += np.bincount(rows[selection], weights=values[selection] * source[cells, channel], minlength=count)
+        output = np.empty((count, channels), dtype=self.dtype) if dst is None else dst.reshape(count, -1)
+        output[...] = np.rint(total) if np.issubdtype(output.dtype, np.integer) else total
+        return output.reshape(tuple(shape) + self.shape[2:])
+    
+    def _cell_blocks(self, cells):
+        # (image, selection, cells in the image) for the flat source cell indices on each tile
+        if self._tiles is None:
+            yield self._image, slice(None), cells
+            return
+        tile_height, tile_width = self._tiles['tile_height'], self._tiles['tile_width']
+        columns = self.tile_grid[1]
+        row, col = np.divmod(cells, self.shape[1])
+        tile = (row // tile_height) * columns + col // tile_width
+        order = np.argsort(tile, kind='stable')
+        present, starts = np.unique(tile[order], return_index=True)
+        for index, start, stop in zip(present, starts, np.append(starts[1:], len(order))):
+            selection = order[start:stop]
+            tile_row, tile_col = divmod(int(index), columns)
+            image = self.tile(tile_row, tile_col)
+            yield image, selection, (row[selection] - tile_row * tile_height) * image.shape[1] + col[selection] - tile_col * tile_width
+    
+    @staticmethod
+    def read_manifest(path):
+        """Read the JSON manifest of a tiled source, given as the file or the directory holding manifest.json.
+        
+        The manifest gives the full "width" and "height", the "tile_width" and
+        "tile_height", and optionally "channels", "dtype" and the tile file
+        "pattern", formatted with the tile row and col.
+        """
+        filename = os.path.join(path, 'manifest.json') if os.path.isdir(path) else path
+        try:
+            with open(filename) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Unable to open tile manifest: {filename}")
+        manifest.setdefault('channels', 3)
+        manifest.setdefault('dtype', 'uint8')
+        manifest.setdefault('pattern', '{row}_{col}.png')
+        manifest['directory'] = os.path.dirname(os.path.abspath(filename))
+        return manifest
+    
+    @staticmethod
+    def write_tiles(image, directory, tile_size=2048, pattern='{row}_{col}.png'):
+        """Cut an image, or an image file, into tiles with their manifest and return the manifest path."""
+        if isinstance(image, str):
+            image = cv.imread(image, cv.IMREAD_UNCHANGED)
+        os.makedirs(directory, exist_ok=True)
+        height, width = image.shape[:2]
+        for row in range(-(-height // tile_size)):
+            for col in range(-(-width // tile_size)):
+                tile = image[row * tile_size:(row + 1) * tile_size, col * tile_size:(col + 1) * tile_size]
+                cv.imwrite(os.path.join(directory, pattern.format(row=row, col=col)), tile)
+        manifest = {'width': width, 'height': height, 'tile_width': tile_size, 'tile_height': tile_size,
+                    'channels': image.shape[2] if image.ndim > 2 else 1, 'dtype': image.dtype.name, 'pattern': pattern}
+        filename = os.path.join(directory, 'manifest.json')
+        with open(filename, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return filename
+    
+    @staticmethod
+    def open_raw(filename):
+        """Map a raw .npy source read-only; pages are read on demand and shared between processes."""
+        try:
+            return np.load(filename, mmap_mode='r')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Unable to open raw image file: {filename}")
+    
+    def write_raw(self, filename):
+        """Write the source as an uncompressed .npy file for open_raw, tile by tile for tiled sources."""
+        temporary = f'{filename}.{os.getpid()}.tmp'
+        raw = np.lib.format.open_memmap(temporary, mode='w+', dtype=self.dtype, shape=self.shape)
+        for y, x, block in self.blocks():
+            raw[y:y + block.shape[0], x:x + block.shape[1]] = block
+        raw.flush()
+        del raw
+        os.replace(temporary, filename)
+        return filename
+    
+    @property
+    def tile_grid(self):
+        """Number of tile (rows, columns) of a tiled source."""
+        return (-(-self._tiles['height'] // self._tiles['tile_height']), -(-self._tiles['width'] // self._tiles['tile_width']))
+    
+    def tile(self, row, col):
+        """Decode one source tile through the tile cache shared by the process."""
+        tiles = self._tiles
+        filename = os.path.join(tiles['directory'], tiles['pattern'].format(row=row, col=col))
+        image = self._tile_cache.get(filename)
+        if image is None:
+            image = cv.imread(filename, cv.IMREAD_UNCHANGED)
+            if image is None:
+                raise FileNotFoundError(f"Unable to open tile file: {filename}")
+            channels = image.shape[2] if image.ndim == 3 else 1
+            if image.dtype != np.dtype(tiles['dtype']) or channels != tiles['channels']:
+                raise ValueError(f"Tile {filename} has {channels} {image.dtype} channels, the manifest gives {tiles['channels']} {tiles['dtype']}")
+            self._tile_cache.put(filename, image)
+        return image
+    
+    @classmethod
+    def set_tile_cache(cls, max_bytes):
+        cls._tile_cache.max_bytes = max_bytes
+    
+    def mosaic(self):
+        """Assemble every tile of a tiled source into one image."""
+        rows, columns = self.tile_grid
+        return np.concatenate([np.concatenate([self.tile(row, col) for col in range(columns)], axis=1) for row in range(rows)])
+    
+    def blocks(self):
+        """Yield (top, left, image) for each tile of a tiled source, or once for the whole image."""
+        if self._tiles is None:
+            yield 0, 0, self._image
+            return
+        rows, columns = self.tile_grid
+        for row in range(rows):
+            for col in range(columns):
+                yield row * self._tiles['tile_height'], col * self._tiles['tile_width'], self.tile(row, col)
+    
+    def _tile_patch(self, row, col, top, bottom, left, right):
+        # The tile framed by margins from the neighbours on the sides the samples reach,
+        # wrapping around the antimeridian and replicating the pole rows
+        margin = self._tile_margin
+        rows, columns = self.tile_grid
+        tile = self.tile(row, col)
+        height, width = tile.shape[:2]
+        patch = cv.copyMakeBorder(tile, margin, margin, margin, margin, cv.BORDER_REPLICATE)
+        vertical = [(0, slice(margin, margin + height), slice(None))]
+        if top and row > 0:
+            vertical.append((-1, slice(0, margin), slice(-margin, None)))
+        if bottom and row + 1 < rows:
+            vertical.append((1, slice(margin + height, None), slice(0, margin)))
+        horizontal = [(0, slice(margin, margin + width), slice(None))]
+        if left:
+            horizontal.append((-1, slice(0, margin), slice(-margin, None)))
+        if right:
+            horizontal.append((1, slice(margin + width, None), slice(0, margin)))
+        for dy, patch_rows, tile_rows in vertical:
+            for dx, patch_cols, tile_cols in horizontal:
+                if dy or dx:
+                    patch[patch_rows, patch_cols] = self.tile(row + dy, (col + dx) % columns)[tile_rows, tile_cols]
+        return patch
+    
+    def _sample_tiles(self, x, y, flag):
+        # Sample flat coordinates tile by tile, decoding only the tiles they fall in
+        height, width = self.shape[:2]
+        tile_height, tile_width = self._tiles['tile_height'], self._tiles['tile_width']
+        rows, columns = self.tile_grid
+        margin = self._tile_margin
+        x, y = np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32)
+        outside = None if self.wraps else (x < 0) | (x > width - 1) | (y < 0) | (y > height - 1)
+        x = np.mod(x, width)
+        y = np.clip(y, 0, height - 1)
+        index = np.minimum(y // tile_height, rows - 1).astype(np.int64) * columns
+        index += np.minimum(x // tile_width, columns - 1).astype(np.int64)
+        order = np.argsort(index, kind='stable')
+        tiles, starts = np.unique(index[order], return_index=True)
+        output = np.empty((x.size,) + self.shape[2:], dtype=self.dtype)
+        for tile, start, stop in zip(tiles, starts, np.append(starts[1:], x.size)):
+            selection = order[start:stop]
+            row, col = divmod(int(tile), columns)
+            tile_x = x[selection] - col * tile_width
+            tile_y = y[selection] - row * tile_height
+            last_x = min(tile_width, width - col * tile_width) - 1 - margin
+            last_y = min(tile_height, height - row * tile_height) - 1 - margin
+            patch = self._tile_patch(row, col, tile_y.min() < margin, tile_y.max() > last_y,
+                                     tile_x.min() < margin, tile_x.max() > last_x)
+            tile_x += margin
+            tile_y += margin
+            output[selection] = self._remap_points(patch, tile_x, tile_y, flag, cv.BORDER_REPLICATE)
+        if outside is not None:
+            output[outside] = 0
+        return output
+    
+    def pyramid(self, directory=None):
+        """Get the area-averaged image pyramid, building it once and persisting it in directory if given."""
+        if self._pyramid is not None:
+            return self._pyramid
+        key = None
+        if directory and self._path:
+            stat = os.stat(self._path)
+            key = RemapCache.key(os.path.abspath(self._path), stat.st_mtime, stat.st_size, self.shape)
+            height, width = self.shape[:2]
+            count = 0
+            while min(height, width) > 1:
+                height, width, count = (height + 1) // 2, (width + 1) // 2, count + 1
+            paths = [os.path.join(directory, f'pyramid-{key}-{level:02d}.npy') for level in range(1, count + 1)]
+            # The remap cache evicts levels one by one, even while they are opened here,
+            # so only a whole pyramid is reused; mapped levels survive their removal
+            try:
+                mapped = []
+                for path in paths:
+                    mapped.append(np.load(path, mmap_mode='r'))
+                    os.utime(path)
+            except (FileNotFoundError, ValueError):
+                mapped = []
+            if count and len(mapped) == count:
+                # Tiled sources keep sampling level 0 from their tiles
+                self._pyramid = [self._image] + mapped
+                return self._pyramid
+        levels = [self._image]
+        if self._tiles is not None:
+            # The first reduction is made tile by tile, and level 0 stays with the tiles
+            height, width = self.shape[:2]
+            half = np.empty(((height + 1) // 2, (width + 1) // 2) + self.shape[2:], dtype=self.dtype)
+            for top, left, block in self.blocks():
+                bottom, right = (top + block.shape[0] + 1) // 2, (left + block.shape[1] + 1) // 2
+                top, left = (top + 1) // 2, (left + 1) // 2
+                half[top:bottom, left:right] = cv.resize(block, (right - left, bottom - top), interpolation=cv.INTER_AREA).reshape(half[top:bottom, left:right].shape)
+            levels.append(half)
+        while min(levels[-1].shape[:2]) > 1:
+            height, width = levels[-1].shape[:2]
+            levels.append(cv.resize(levels[-1], ((width + 1) // 2, (height + 1) // 2), interpolation=cv.INTER_AREA))
+        if key:
+            for path, image in zip(paths, levels[1:]):
+                # Write to a temporary name first so concurrent jobs never map partial files
+                temporary = f'{path}.{os.getpid()}.tmp'
+                with open(temporary, 'wb') as file:
+                    np.save(file, image)
+                os.replace(temporary, path)
+        self._pyramid = levels
+        return levels
+    
+    @staticmethod
+    def _derivative(table, axis):
+        # Forward difference, repeating the last one at the edge
+        if table.shape[axis] < 2:
+            return np.zeros_like(table)
+        step = np.diff(table, axis=axis)
+        return np.concatenate([step, np.take(step, [-1], axis=axis)], axis=axis)
+    
+    def level_of_detail(self, tables):
+        """Per-pixel pyramid level, log2 of the source footprint of an output pixel, from the local Jacobian of float32 tables."""
+        map_x, map_y = tables
+        width = self.shape[1]
+        footprint = None
+        for axis in (0, 1):
+            dx = self._derivative(map_x, axis)
+            # Steps across the antimeridian are short, not a whole turn
+            dx -= width * np.round(dx / width)
+            dy = self._derivative(map_y, axis)
+            dx *= dx
+            dy *= dy
+            dx += dy
+            footprint = dx if footprint is None else np.maximum(footprint, dx, out=footprint)
+        np.maximum(footprint, 1, out=footprint)
+        np.log2(footprint, out=footprint)
+        footprint *= 0.5
+        return footprint
+    
+    def sample_mipmap(self, tables, interpolation=None, dst=None, directory=None, mask=None):
+        """Sample through float32 tables blending the two pyramid levels closest to each pixel's footprint.
+        
+        With a boolean mask, only the output pixels inside it are sampled and the rest are zero.
+        """
+        levels = self.pyramid(directory)
+        map_x, map_y = tables
+        lod = np.minimum(self.level_of_detail(tables), len(levels) - 1).ravel()
+        if mask is not None:
+            # Footprints next to the edge of the mask have no neighbour to measure against
+            np.nan_to_num(lod, copy=False, nan=0.0)
+            lod[~mask.ravel()] = -1
+        base = lod.astype(np.int8)
+        channels = self.shape[2:]
+        weight = (lod - base).reshape((-1,) + (1,) * len(channels))
+        output = np.empty(map_x.shape + channels, dtype=self.dtype) if dst is None else dst
+        flat = output.reshape((-1,) + channels)
+        height, width = self.shape[:2]
+        flag = self.interpolation_flag(interpolation)
+        
+        def sample_level(level, selection):
+            # Level pixel centres sit between the pixels they average
+            if level == 0:
+                return self._sample_points(map_x.ravel()[selection], map_y.ravel()[selection], flag).astype(np.float32)
+            image = levels[level]
+            scale_x, scale_y = image.shape[1] / width, image.shape[0] / height
+            x = (map_x.ravel()[selection] + 0.5) * scale_x - 0.5
+            y = (map_y.ravel()[selection] + 0.5) * scale_y - 0.5
+            return self._remap_points(image, x, y, flag, self.border).astype(np.float32)
+        
+        for level in np.unique(base):
+            selection = np.flatnonzero(base == level)
+            if level < 0:
+                flat[selection] = 0
+                continue
+            values = sample_level(level, selection)
+            if level + 1 < len(levels):
+                blend = weight[selection]
+                values *= 1 - blend
+                values += blend * sample_level(level + 1, selection)
+            flat[selection] = np.rint(values) if np.issubdtype(flat.dtype, np.integer) else values
+        return output
+
+class CubeMapImage(MapImage):
+    """A source map resampled once into six gnomonic cube faces with near uniform texel density.
+    
+    The faces are packed, each framed by a margin of its own extension over the
+    sphere, into one 3x2 atlas image, so remap tables, caches and cv.remap work
+    on it as on any other source.
+    """
+    # Extra texels around each face, enough for bicubic sampling at the seams
+    _face_margin = 2
+    
+    def __init__(self, source, face_size=None):
+        # About the source's equatorial density in two thirds of its memory
+        face_size = face_size or max(1, int(round(source.shape[0] * np.sqrt(2) / 3)))
+        self._setup(None, None, interpolation=source.interpolation)
+        self._face_size = face_size
+        self._source_key = source.source_key
+        margin = self._face_margin
+        cell = face_size + 2 * margin
+        self._image = np.empty((2 * cell, 3 * cell) + source.shape[2:], dtype=source.dtype)
+        t = (np.arange(-margin, face_size + margin, dtype=np.float32) + 0.5) * (2 / face_size) - 1
+        for face in range(6):
+            axis, sign = face // 2, 1 - 2 * (face % 2)
+            xyz = np.empty((cell, cell, 3), dtype=np.float32)
+            xyz[..., axis] = sign
+            xyz[..., (axis + 1) % 3] = t
+            xyz[..., (axis + 2) % 3] = sign * t[:, np.newaxis]
+            xyz /= np.linalg.norm(xyz, axis=-1, keepdims=True)
+            row, col = divmod(face, 3)
+            source.sample(source.image_tables(xyz), cv.INTER_LINEAR,
+                          dst=self._image[row * cell:(row + 1) * cell, col * cell:(col + 1) * cell])
+    
+    @property
+    def face_size(self):
+        return self._face_size
+    
+    @property
+    def wraps(self):
+        return False
+    
+    @property
+    def border(self):
+        return cv.BORDER_REPLICATE
+    
+    def separable(self):
+        return False
+    
+    @property
+    def source_key(self):
+        return (self.shape[:2], 'cube', self._face_size, self._source_key)
+    
+    def cube_map(self, face_size=None):
+        return self
+    
+    def face_coords(self, point: np.ndarray):
+        """Face index, from the dominant component of (..., 3) xyz vectors, and face coordinates in [-1, 1]."""
+        xyz = np.asarray(point)
+        axis = np.abs(xyz).argmax(axis=-1)[..., np.newaxis]
+        w = np.take_along_axis(xyz, axis, -1)[..., 0]
+        u = np.take_along_axis(xyz, (axis + 1) % 3, -1)[..., 0] / np.abs(w)
+        v = np.take_along_axis(xyz, (axis + 2) % 3, -1)[..., 0] / w
+        face = axis[..., 0] * 2 + (w < 0)
+        return face, u, v
+    
+    def image_tables(self, point: np.ndarray):
+        face, u, v = self.face_coords(point)
+        cell = self._face_size + 2 * self._face_margin
+        half = self._face_size / 2
+        offset = self._face_margin + half - 0.5
+        row, col = np.divmod(face, 3)
+        map_x = (col * cell + offset).astype(np.float32)
+        map_x += u * half
+        map_y = (row * cell + offset).astype(np.float32)
+        map_y += v * half
+        return map_x, map_y
+    
+    def coord_tables(self, lon, lat):
+        return self.image_tables(coord_grid_to_xyz(np.array(lon, dtype=np.float32), np.array(lat, dtype=np.float32)))
+    
+    def coord_to_image(self, lon, lat):
+        return self.coord_tables(lon, lat)
+
+# Shape and dtype standing in for the pixels of a source geometry
+_ImageGeometry = collections.namedtuple('_ImageGeometry', 'shape dtype')
+
+_strip_context = None
+
+def _init_strip_worker(projection, map_image, over_map_area, tolerance):
+    global _strip_context
+    _strip_context = (projection, map_image, over_map_area, tolerance)
+
+def _strip_tables(rows):
+    projection, map_image, over_map_area, tolerance = _strip_context
+    return projection._compute_tables(map_image, over_map_area, rows, tolerance)
 
 def split_text(text, chunk_size=80, first_chunk_size=None):
     if first_chunk_size is None:
         return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
     return [text[:first_chunk_size]] + [text[i:i+chunk_size] for i in range(first_chunk_size, len(text), chunk_size)]
 
+def rotation_matrix(longitude, latitude, azimuth=0.0):
+    """Rotation taking the point (longitude, latitude) to the origin, then turning the view by azimuth."""
+    lam, phi, alpha = np.radians([longitude, latitude, azimuth])
+    meridian = np.array([
+        [np.cos(lam), 0, np.sin(lam)],
+        [0, 1, 0],
+        [-np.sin(lam), 0, np.cos(lam)]])
+    parallel = np.array([
+        [np.cos(phi), np.sin(phi), 0],
+        [-np.sin(phi), np.cos(phi), 0],
+        [0, 0, 1]])
+    view = np.array([
+        [1, 0, 0],
+        [0, np.cos(alpha), np.sin(alpha)],
+        [0, -np.sin(alpha), np.cos(alpha)]])
+    return view @ parallel @ meridian
+
+def _frozen(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_frozen(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _frozen(item)) for key, item in value.items()))
+    if isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    return value
+
+class RemapCache(object):
+    """Two-level cache of (map_x, map_y) remap tables.
+
+    Tables live in an in-process LRU bounded by max_bytes and, when a directory
+    is given, as memory-mappable .npy files bounded by max_disk_bytes. Sparse
+    regrid weights are kept apart, in the directory or else in an LRU of their
+    own bounded by max_weight_bytes.
+    """
+    def __init__(self, directory=None, max_bytes=256 << 20, max_disk_bytes=None, max_weight_bytes=1 << 30):
+        self._memory = bytecache(max_bytes)
+        self._weights = bytecache(max_weight_bytes)
+        self._directory = directory
+        self._max_disk_bytes = max_disk_bytes
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def max_bytes(self):
+        return self._memory.max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        self._memory.max_bytes = value
+
+    @property
+    def max_disk_bytes(self):
+        return self._max_disk_bytes
+
+    @max_disk_bytes.setter
+    def max_disk_bytes(self, value):
+        self._max_disk_bytes = value
+        self.evict_disk()
+
+    @staticmethod
+    def key(*parts):
+        # Stable across processes, unlike hash()
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, f'remap-{key}.npy')
+
+    def get(self, key):
+        tables = self._memory.get(key)
+        if tables is not None or not self._directory:
+            return tables
+        path = self._path(key)
+        try:
+            stacked = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path)
+        tables = (stacked[0], stacked[1])
+        self._memory.put(key, tables)
+        return tables
+
+    def put(self, key, tables, disk=True):
+        self._memory.put(key, tables)
+        if not (disk and self._directory):
+            return
+        # Write to a temporary name first so concurrent jobs never read partial files
+        path = self._path(key)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            np.save(file, np.stack(tables))
+        os.replace(temporary, path)
+        self.evict_disk()
+
+    def create(self, key, shape):
+        """Open a writable, disk-backed (2, H, W) table array to be filled band by band, or None without a directory."""
+        if not self._directory:
+            return None
+        temporary = f'{self._path(key)}.{os.getpid()}.tmp'
+        return np.lib.format.open_memmap(temporary, mode='w+', dtype=np.float32, shape=(2,) + tuple(shape))
+
+    def commit(self, key, stacked):
+        """Publish an array opened with create() under its key."""
+        stacked.flush()
+        temporary = stacked.filename
+        del stacked
+        os.replace(temporary, self._path(key))
+        self.evict_disk()
+
+    def get_weights(self, key):
+        weights = self._weights.get(key)
+        if weights is not None or not self._directory:
+            return weights
+        path = self._path(key)
+        try:
+            records = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        weights = (records['row'], records['column'], records['weight'])
+        # The pages belong to the file, not to the memory budget
+        self._weights.put(key, weights, nbytes=0)
+        return weights
+
+    def put_weights(self, key, weights):
+        """Keep sparse (rows, columns, weights) regrid weights, memory-mapped from the directory if there is one.
+        
+        Returns the weights to use, which are file backed once written.
+        """
+        if self._directory:
+            rows, columns, values = weights
+            records = np.empty(len(rows), dtype=[('row', rows.dtype), ('column', columns.dtype), ('weight', values.dtype)])
+            records['row'], records['column'], records['weight'] = rows, columns, values
+            path = self._path(key)
+            temporary = f'{path}.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as file:
+                np.save(file, records)
+            del records
+            os.replace(temporary, path)
+            self.evict_disk()
+            mapped = self.get_weights(key)
+            if mapped is not None:
+                return mapped
+        if not self._weights.put(key, weights):
+            nbytes = sum(array.nbytes for array in weights)
+            warnings.warn(f'Regrid weights of {nbytes >> 20} MiB exceed the {self._weights.max_bytes >> 20} MiB weight cache '
+                          'and are rebuilt on every use; give the remap cache a directory or a larger max_weight_bytes')
+        return weights
+
+    def clear(self, disk=False):
+        self._memory.clear()
+        self._weights.clear()
+        if disk and self._directory:
+            for path in self._disk_files():
+                os.remove(path)
+
+    def _disk_files(self):
+        # Image pyramids persisted next to the tables share their budget
+        names = (name for name in os.listdir(self._directory) if name.startswith(('remap-', 'pyramid-')) and name.endswith('.npy'))
+        return [os.path.join(self._directory, name) for name in names]
+
+    def evict_disk(self):
+        """Remove the least recently used files until the directory fits in max_disk_bytes."""
+        if not self._directory or self._max_disk_bytes is None:
+            return
+        files = []
+        for path in self._disk_files():
+            # Other jobs evict from the same directory
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self._max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def coord_grid_to_xyz(lon, lat):
+    """Convert longitude and latitude grids in degrees, in place, into an (..., 3) xyz grid of the same precision."""
+    xyz = np.empty(np.shape(lon) + (3,), dtype=np.result_type(lon, np.float32))
+    lam = np.radians(lon, out=lon)
+    phi = np.radians(lat, out=lat)
+    np.sin(phi, out=xyz[..., 1])
+    cos_phi = np.cos(phi, out=phi)
+    np.cos(lam, out=xyz[..., 0])
+    xyz[..., 0] *= cos_phi
+    np.sin(lam, out=xyz[..., 2])
+    xyz[..., 2] *= cos_phi
+    return xyz
+
+class ProjectionPlan(object):
+    """Immutable snapshot of a projection's parameters with precomputed constants.
+
+    Plans compare and hash by the projection kind and parameters, so they can be
+    used as cache keys wherever the same projection is rendered more than once.
+    """
+    __slots__ = ('kind', 'params', 'central_meridian', 'central_latitude', 'viewpoint_azimuth',
+                 'map_size', 'window_size', 'window_offset', 'dtype', 'scale', 'origin', 'rotation', '_key', '_hash')
+
+    def __init__(self, kind, **params):
+        width, height = (int(n) for n in params['map_size'])
+        window_size = params.get('window_size') or (width, height)
+        window_offset = params.get('window_offset') or (0, 0)
+        central_meridian = float(params.get('central_meridian', 0.0))
+        central_latitude = float(params.get('central_latitude', 0.0))
+        viewpoint_azimuth = float(params.get('viewpoint_azimuth', 0.0))
+        dtype = np.dtype(params.get('precision') or 'float64')
+        params = _frozen(dict(params, map_size=(width, height), window_size=window_size, window_offset=window_offset))
+        values = {
+            'kind': kind,
+            'params': params,
+            'central_meridian': central_meridian,
+            'central_latitude': central_latitude,
+            'viewpoint_azimuth': viewpoint_azimuth,
+            'map_size': (width, height),
+            'window_size': tuple(int(n) for n in window_size),
+            'window_offset': tuple(int(n) for n in window_offset),
+            # Working precision of coordinate grids
+            'dtype': dtype,
+            # Pixels per degree and pixel position of the central point
+            'scale': (width / 360, height / 180),
+            'origin': (width / 2, height / 2),
+            'rotation': _frozen(rotation_matrix(central_meridian, central_latitude, viewpoint_azimuth)),
+            '_key': (kind, params),
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, '_hash', hash(self._key))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable")
+
+    def __reduce__(self):
+        return (_plan_from_key, (self._key,))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return isinstance(other, ProjectionPlan) and self._key == other._key
+
+    def __repr__(self):
+        params = ', '.join(f'{key}={value!r}' for key, value in self.params)
+        return f'<{self.__class__.__name__} {self.kind}({params})>'
+
+    @property
+    def key(self):
+        return self._key
+
+    def param(self, name, default=None):
+        return dict(self.params).get(name, default)
+
+    @property
+    def rotation_array(self):
+        return np.array(self.rotation)
+
+def _plan_from_key(key):
+    kind, params = key
+    return ProjectionPlan(kind, **dict(params))
+
 class Projection(collector, attributer):
+    _remap_cache = RemapCache()
+    # Cylindrical projections map columns to meridians and rows to parallels
+    _separable = True
+    # Projections that leave part of the map empty mask it out of the remap tables
+    _masked = False
+
     def __init__(self, name=None, **kwargs):
         name = name or self.__class__.__name__
         self._name = name
         self._outside = None
+        self._plan = None
+        self._frame = None
         attributes = { **self._default_params, **kwargs }
         collector.__init__(self, name)
         attributer.__init__(self, **attributes)
@@ -79,49 +1078,201 @@ class Projection(collector, attributer):
         'viewpoint_azimuth': 0.0,
         'map_size': (1440, 720),
         'window_size': None,
-        'window_offset': (0,0)
+        'window_offset': (0,0),
+        'precision': 'float32'
     }
     def _valid_key(self, key):
         return key in self._default_params.keys()
     
+    def __setattr__(self, name, value):
+        attributer.__setattr__(self, name, value)
+        if not name.startswith('_'):
+            # Parameters changed: the compiled plan is stale
+            self._plan = None
+    
+    def compile(self):
+        """Freeze the current parameters into a ProjectionPlan."""
+        self._plan = ProjectionPlan(self.__class__.__name__, **self._attributes)
+        return self._plan
+    
+    @property
+    def plan(self):
+        return self._plan or self.compile()
+    
+    def detached(self, **kwargs):
+        """A private copy with some parameters changed, kept out of the registry so the registered projection is untouched."""
+        projection = copy.copy(self)
+        projection._attributes = dict(self._attributes, **kwargs)
+        projection._plan = projection._frame = None
+        return projection
+    
+    def max_pixels_per_degree(self):
+        """Most map pixels per degree of arc, the finest source detail the map can show."""
+        return float(max(self.plan.scale))
+    
     def __call__(self, point: CoordinatePoint):
         return self.coord_to_pixel(point)
 
     def coord_to_pixel(self, point: CoordinatePoint):
-        x = 0.5 + (point.longitude - self.central_meridian)/360
-        y = 0.5 - (point.latitude - self.central_latitude)/180
+        plan = self.plan
+        if not self.separable():
+            x, y = self.project_xyz(np.asarray(point._arg, dtype=float))
+            return float(x), float(y)
+        x = 0.5 + (point.longitude - plan.central_meridian)/360
+        y = 0.5 - point.latitude/180
+        x %= 1
+        return plan.map_size[0]*x, plan.map_size[1]*y
+
+    def project_array(self, lon, lat, tolerance=None):
+        """Project longitude and latitude arrays, in degrees, into pixel arrays.
+        
+        A tolerance in pixels lets projections without a closed form interpolate instead of solving exactly.
+        """
+        if self.oblique():
+            return self.project_xyz(coord_grid_to_xyz(np.array(lon, dtype=float), np.array(lat, dtype=float)), tolerance)
+        plan = self.plan
+        return self._view_to_pixel(np.asarray(lon, dtype=float) - plan.central_meridian, np.asarray(lat, dtype=float), tolerance)
+
+    def project_xyz(self, xyz, tolerance=None):
+        """Project an (..., 3) array of unit vectors into pixel arrays."""
+        if not self.oblique():
+            return self.project_array(*xyz_to_coord(xyz), tolerance=tolerance)
+        # The meridian shift is part of the rotation
+        return self._view_to_pixel(*xyz_to_coord(self.to_view(xyz)), tolerance)
+    
+    def project_path(self, xyz, tolerance=None):
+        """Project an (N, 3) array of path vertices into pixel arrays, and flag the vertices the path must not be drawn into from the previous one.
+        
+        The flags are None when the path only breaks at hidden (NaN) vertices.
+        """
+        x, y = self.project_xyz(xyz, tolerance)
+        return x, y, None
+    
+    def _view_to_pixel(self, lon, lat, tolerance=None):
+        # Longitude and latitude in the view frame, in degrees, to pixels
+        plan = self.plan
+        x = lon / 360
+        x += 0.5
         x %= 1
-        return self.map_size[0]*x, self.map_size[1]*y
+        x *= plan.map_size[0]
+        y = lat * -plan.scale[1]
+        y += plan.origin[1]
+        return x, y
+    
+    def oblique(self):
+        """Whether the central latitude or the azimuth tilt the view away from the normal aspect."""
+        plan = self.plan
+        return plan.central_latitude != 0 or plan.viewpoint_azimuth != 0
+    
+    def to_view(self, xyz):
+        """Rotate an (..., 3) array of unit vectors into the view frame, where the central point lies on the x axis."""
+        xyz = np.asarray(xyz)
+        dtype = np.result_type(xyz, np.float32)
+        return xyz @ self.plan.rotation_array.T.astype(dtype)
+    
+    def from_view(self, view):
+        """Longitude and latitude grids, in degrees and in the precision of view, for a (3, ...) stack of view-frame x, y and z planes.
+        
+        Planes rather than (..., 3) vectors keep the rotation a single matrix product
+        and every later pass over contiguous memory.
+        """
+        shape = view.shape[1:]
+        x, y, z = self.plan.rotation_array.T.astype(view.dtype) @ view.reshape(3, -1)
+        lon = np.arctan2(z, x)
+        np.degrees(lon, out=lon)
+        x *= x
+        z *= z
+        x += z
+        lat = np.arctan2(y, np.sqrt(x, out=x))
+        np.degrees(lat, out=lat)
+        return lon.reshape(shape), lat.reshape(shape)
+
+    def column_longitudes(self, x):
+        plan = self.plan
+        return (np.asarray(x) - plan.origin[0])/plan.scale[0] + plan.central_meridian
+    
+    def row_latitudes(self, y):
+        plan = self.plan
+        return (plan.origin[1] - np.asarray(y))/plan.scale[1]
     
     def pixel_to_coord(self, pixel):
-        lon = (pixel[0]/self.map_size[0] - 0.5)*360 + self.central_meridian
-        lat = (0.5 - pixel[1]/self.map_size[1])*180 + self.central_latitude
-        return CoordinatePoint(lon, lat)
+        if self.separable():
+            return CoordinatePoint(self.column_longitudes(pixel[0]), self.row_latitudes(pixel[1]))
+        # Coordinate grids are built from planes, which need at least one axis
+        shape = np.broadcast_shapes(np.shape(pixel[0]), np.shape(pixel[1]))
+        lon, lat = self.pixel_coords(*np.atleast_1d(pixel[0], pixel[1]), np.float64)
+        return CoordinatePoint(lon.reshape(shape), lat.reshape(shape))
+    
+    def pixel_coords(self, x, y, dtype=None):
+        """Longitude and latitude grids, in degrees, for broadcastable pixel column and row arrays."""
+        dtype = dtype or self.plan.dtype
+        x, y = np.asarray(x, dtype=dtype), np.asarray(y, dtype=dtype)
+        shape = np.broadcast_shapes(x.shape, y.shape)
+        if self.oblique():
+            return self.from_view(self._view_grid(x, y, shape, dtype))
+        # Latitude only depends on the row: fold rows past the poles back onto the
+        # opposite meridian before broadcasting, so only lon and lat are full size
+        lat = self.row_latitudes(y).astype(dtype, copy=False)
+        lat += 90
+        np.mod(lat, 360, out=lat)
+        flipped = lat > 180
+        lat -= 180
+        np.abs(lat, out=lat)
+        np.subtract(90, lat, out=lat)
+        lon = np.empty(shape, dtype=dtype)
+        np.add(self.column_longitudes(x), np.where(flipped, 180, 0).astype(dtype), out=lon)
+        return lon, np.broadcast_to(lat, shape).copy()
+    
+    def _view_grid(self, x, y, shape, dtype):
+        # View-frame unit vectors for pixel arrays, with the trig done on the columns and rows alone
+        plan = self.plan
+        lam = np.radians((x - plan.origin[0]) / plan.scale[0]).astype(dtype, copy=False)
+        phi = np.radians((plan.origin[1] - y) / plan.scale[1]).astype(dtype, copy=False)
+        cos_phi = np.cos(phi)
+        view = np.empty((3,) + shape, dtype=dtype)
+        np.multiply(cos_phi, np.cos(lam), out=view[0])
+        view[1] = np.sin(phi)
+        np.multiply(cos_phi, np.sin(lam), out=view[2])
+        return view
+    
+    def pixel_mask(self, x, y):
+        """Boolean grid of the broadcastable pixel positions that show the map, or None if all of them do."""
+        return None
+    
+    def grid_pixels(self, over_map_area=False, rows=None, dtype=None):
+        """Broadcastable pixel column and row arrays for the window, or the whole map, or a band of their rows."""
+        plan = self.plan
+        dtype = dtype or plan.dtype
+        width, height = plan.map_size if over_map_area else plan.window_size
+        x0, y0 = (0, 0) if over_map_area else plan.window_offset
+        top, bottom = rows or (0, height)
+        x = np.arange(x0, x0 + width, dtype=dtype)
+        y = np.arange(y0 + top, y0 + bottom, dtype=dtype)[:, np.newaxis]
+        return x, y
+    
+    def grid_coords(self, over_map_area=False, rows=None, dtype=None):
+        """Longitude and latitude grids for the window, or the whole map, or a band of their rows."""
+        return self.pixel_coords(*self.grid_pixels(over_map_area, rows, dtype), dtype or self.plan.dtype)
     
     def pixel_to_xyz(self, pixel, dtype=None):
         coord = self.pixel_to_coord(pixel)
-        return tuple(coord) if dtype is None else coord._arg.astype(dtype)
-
-    def area_map(self, dtype=np.float32):
-        # Generate coordinate grid for all pixels in the area
-        x_coords = np.arange(self.map_size[0])
-        y_coords = np.arange(self.map_size[1])
-        xx, yy = np.meshgrid(x_coords, y_coords, indexing='xy')
-
-        # Convert area coordinates to XYZ coordinates
-        coords = self.pixel_to_xyz((xx, yy), dtype=dtype)
+        return tuple(coord) if dtype is None else np.ascontiguousarray(np.moveaxis(coord._arg, 0, -1), dtype=dtype)
 
-        return coords
+    def area_map(self, dtype=np.float32, rows=None):
+        # Generate XYZ coordinates for all pixels in the area, or only for a band of rows
+        return coord_grid_to_xyz(*self.grid_coords(True, rows, dtype))
         
     def shift_offset(self, pixel):
-        x = pixel[0] - self.window_offset[0]
-        y = pixel[1] - self.window_offset[1]
-        self._outside = x < 0 or x >= self.window_size[0] or y < 0 or y >= self.window_size[1]
+        plan = self.plan
+        x = pixel[0] - plan.window_offset[0]
+        y = pixel[1] - plan.window_offset[1]
+        self._outside = x < 0 or x >= plan.window_size[0] or y < 0 or y >= plan.window_size[1]
         return x, y
     
     def unshift_offset(self, pixel):
-        x = pixel[0] + self.window_offset[0]
-        y = pixel[1] + self.window_offset[1]
+        plan = self.plan
+        x = pixel[0] + plan.window_offset[0]
+        y = pixel[1] + plan.window_offset[1]
         return x, y
     
     def coord_to_window(self, point: CoordinatePoint):
@@ -132,18 +1283,11 @@ class Projection(collector, attributer):
     
     def window_to_xyz(self, pixel, dtype=None):
         coord = self.window_to_coord(pixel)
-        return tuple(coord) if dtype is None else coord._arg.astype(dtype)
+        return tuple(coord) if dtype is None else np.ascontiguousarray(np.moveaxis(coord._arg, 0, -1), dtype=dtype)
     
-    def window_map(self, dtype=np.float32):
-        # Generate coordinate grid for all pixels in the window
-        x_coords = np.arange(self.window_size[0])
-        y_coords = np.arange(self.window_size[1])
-        xx, yy = np.meshgrid(x_coords, y_coords, indexing='xy')
-
-        # Convert window coordinates to XYZ coordinates
-        coords = self.window_to_xyz((xx, yy), dtype=dtype)
-
-        return coords
+    def window_map(self, dtype=np.float32, rows=None):
+        # Generate XYZ coordinates for all pixels in the window, or only for a band of rows
+        return coord_grid_to_xyz(*self.grid_coords(False, rows, dtype))
     
     @property
     def outside(self):
@@ -197,13 +1341,19 @@ class Projection(collector, attributer):
         self.viewpoint_azimuth = azimuth
         return True
     
+    def set_precision(self, precision):
+        if precision is None:
+            return False
+        self.precision = np.dtype(precision).name
+        return True
+    
     def set_map_size(self, size):
         if size is None:
             return False
         self.map_size = size
         return True
     
-    def set_windwow_size(self, size):
+    def set_window_size(self, size):
         if size is None:
             return False
         self.window_size = size
@@ -218,23 +1368,434 @@ class Projection(collector, attributer):
     def mapless(self):
         return False
     
-    def project_map(self, map_filename, interpolation=cv.INTER_NEAREST, over_map_area=False):
-        map_image = MapImage(map_filename, interpolation=interpolation)
-        coords = self.area_map() if over_map_area else self.window_map()
-        image_coords = map_image.spatial_to_image(coords)
-        return map_image.get_value(image_coords)
+    @classmethod
+    def set_remap_cache(cls, directory=None, max_bytes=256 << 20, max_disk_bytes=None, max_weight_bytes=1 << 30):
+        cls._remap_cache = RemapCache(directory, max_bytes, max_disk_bytes, max_weight_bytes)
+        return cls._remap_cache
+    
+    # Rough working set per output pixel while building remap tables: the int64
+    # pixel grid, float64 trig temporaries, the xyz grid and the float32 tables
+    _bytes_per_pixel = 128
+    
+    @classmethod
+    def bands(cls, width, height, max_memory=None, bytes_per_pixel=None, count=1):
+        """Split height rows into at least count (start, stop) bands whose working set fits in max_memory bytes."""
+        rows = -(-height // max(1, count))
+        if max_memory:
+            rows = min(rows, int(max_memory) // (width * (bytes_per_pixel or cls._bytes_per_pixel)))
+        rows = max(1, rows)
+        return [(y, min(y + rows, height)) for y in range(0, height, rows)]
+    
+    def _tables_key(self, map_image, over_map_area=False, tolerance=None):
+        return self._remap_cache.key(self.plan.key, over_map_area, map_image.source_key, tolerance)
+    
+    def separable(self):
+        """Whether longitude depends only on the pixel column and latitude only on the row."""
+        # Oblique aspects mix both through the rotation
+        return self._separable and not self.oblique()
+    
+    def _compute_tables(self, map_image, over_map_area=False, rows=None, tolerance=None):
+        if self.separable() and map_image.separable():
+            return self._separable_tables(map_image, over_map_area, rows)
+        if tolerance:
+            return self._coarse_tables(map_image, over_map_area, rows, tolerance)
+        x, y = self.grid_pixels(over_map_area, rows)
+        mask = self.pixel_mask(x, y)
+        if mask is None:
+            return map_image.coord_tables(*self.pixel_coords(x, y))
+        # Only the pixels on the mask are projected back; the rest of the tables is NaN
+        map_x = np.full(mask.shape, np.nan, dtype=np.float32)
+        map_y = map_x.copy()
+        x, y = (np.broadcast_to(a, mask.shape)[mask] for a in (x, y))
+        map_x[mask], map_y[mask] = map_image.coord_tables(*self.pixel_coords(x, y))
+        return map_x, map_y
+    
+    def _table_mask(self, tables):
+        # Masked projections leave NaN in the float32 tables off the map
+        return ~np.isnan(tables[0]) if self._masked else None
+    
+    def _point_tables(self, map_image, x, y, over_map_area=False):
+        # Exact table values at arbitrary window (or map) pixel positions
+        pixel = (x, y) if over_map_area else self.unshift_offset((x, y))
+        return map_image.coord_tables(*self.pixel_coords(*pixel))
+    
+    # Side of the initial lattice cells for coarse-grid tables, in output pixels
+    _coarse_step = 32
+    
+    def _coarse_tables(self, map_image, over_map_area=False, rows=None, tolerance=0.25):
+        """Interpolate remap tables from a coarse lattice, refining cells whose error exceeds tolerance source pixels."""
+        plan = self.plan
+        width, height = plan.map_size if over_map_area else plan.window_size
+        top, bottom = rows or (0, height)
+        source_height, source_width = map_image.shape[:2]
+        map_x = np.empty((bottom - top, width), dtype=np.float32)
+        map_y = np.empty_like(map_x)
+        
+        def exact(x, y):
+            x, y = np.broadcast_arrays(x.astype(float), y.astype(float))
+            return self._point_tables(map_image, x, y, over_map_area)
+        
+        def unwrap(x, reference):
+            # Longitudes are periodic in the source: take the copy closest to reference
+            if not map_image.wraps:
+                return x
+            return x - source_width * np.round((x - reference) / source_width)
+        
+        step = self._coarse_step
+        lattice = np.mgrid[top:bottom:step, 0:width:step]
+        y0, x0 = (grid.ravel() for grid in lattice)
+        while len(x0):
+            if step == 1:
+                map_x[y0 - top, x0], map_y[y0 - top, x0] = exact(x0, y0)
+                break
+            
+            # Exact values on the cell corners, as (cells, 2, 2) arrays
+            corner = np.array([0, step])
+            kx, ky = exact(x0[:, None, None] + corner, y0[:, None, None] + corner[:, None])
+            kx = unwrap(kx, kx[:, :1, :1])
+            
+            # Compare with exact values at the centre and the edge midpoints
+            u = np.array([0.5, 0.5, 0.0, 1.0, 0.5])
+            v = np.array([0.5, 0.0, 0.5, 0.5, 1.0])
+            ex, ey = exact(x0[:, None] + step * u, y0[:, None] + step * v)
+            ix, iy = (k[:, 0, 0, None] * (1 - u) * (1 - v) + k[:, 0, 1, None] * u * (1 - v)
+                      + k[:, 1, 0, None] * (1 - u) * v + k[:, 1, 1, None] * u * v for k in (kx, ky))
+            error = np.maximum(np.abs(unwrap(ex, ix) - ix), np.abs(ey - iy)).max(axis=1)
+            # Cells off a mask are NaN throughout and keep it; cells across its edge are refined
+            refine = ~(error <= tolerance)
+            refine &= ~(np.isnan(kx).all(axis=(1, 2)) & np.isnan(ex).all(axis=1))
+            # Cells around a pole sweep through all longitudes; cells on a pole line are clamped
+            refine |= np.ptp(kx.reshape(len(x0), -1), axis=1) > source_width / 2
+            refine |= (ky.min(axis=(1, 2)) <= 0) | (ky.max(axis=(1, 2)) >= source_height - 1)
+            
+            # Bilinear fill: the whole first lattice as one dense block, since refined
+            # cells are overwritten later, then only the accepted cells of finer levels
+            s = np.arange(step, dtype=np.float32) / step
+            t = s[:, None]
+            dense = step == self._coarse_step
+            good = slice(None) if dense else ~refine
+            for table, k in ((map_x, kx[good]), (map_y, ky[good])):
+                # Interpolate along the top and bottom edges first, then down the columns
+                k = k.astype(np.float32)
+                upper = k[:, 0, 0, None] + s * (k[:, 0, 1] - k[:, 0, 0])[:, None]
+                lower = k[:, 1, 0, None] + s * (k[:, 1, 1] - k[:, 1, 0])[:, None]
+                values = t * (lower - upper)[:, None, :]
+                values += upper[:, None, :]
+                if dense:
+                    rows_, columns = lattice.shape[1:]
+                    values = values.reshape(rows_, columns, step, step).transpose(0, 2, 1, 3)
+                    table[...] = values.reshape(rows_ * step, columns * step)[:bottom - top, :width]
+                else:
+                    yy, xx = np.broadcast_arrays(y0[good, None, None] + np.arange(step)[:, None], x0[good, None, None] + np.arange(step))
+                    inside = (yy < bottom) & (xx < width)
+                    table[yy[inside] - top, xx[inside]] = values[inside]
+            
+            # Split the rejected cells in four
+            step //= 2
+            x0 = (x0[refine, None] + np.array([0, step, 0, step])).ravel()
+            y0 = (y0[refine, None] + np.array([0, 0, step, step])).ravel()
+            inside = (x0 < width) & (y0 < bottom)
+            x0, y0 = x0[inside], y0[inside]
+        
+        if map_image.wraps:
+            map_x %= source_width
+        x, y = self.grid_pixels(over_map_area, rows)
+        mask = self.pixel_mask(x, y)
+        if mask is not None:
+            # Probes can miss a sliver of the mask inside a cell, or of the outside
+            missing = mask & np.isnan(map_x)
+            if missing.any():
+                rows_, columns = np.nonzero(missing)
+                map_x[missing], map_y[missing] = exact(columns, rows_ + top)
+            map_x[~mask] = map_y[~mask] = np.nan
+        return map_x, map_y
+    
+    def _separable_tables(self, map_image, over_map_area=False, rows=None):
+        # One lookup per column and one per row instead of trig on every pixel
+        plan = self.plan
+        width, height = plan.map_size if over_map_area else plan.window_size
+        x0, y0 = (0, 0) if over_map_area else plan.window_offset
+        top, bottom = rows or (0, height)
+        lon = self.column_longitudes(np.arange(x0, x0 + width))
+        lat = self.row_latitudes(np.arange(y0 + top, y0 + bottom))
+        return map_image.separable_tables(lon, lat)
+    
+    def remap_tables(self, map_image, over_map_area=False, tolerance=None):
+        """Get the float32 (map_x, map_y) tables sampling map_image over the window or the whole map."""
+        cache = self._remap_cache
+        key = self._tables_key(map_image, over_map_area, tolerance)
+        tables = cache.get(key)
+        if tables is None:
+            tables = self._compute_tables(map_image, over_map_area, tolerance=tolerance)
+            cache.put(key, tables)
+        return tables
+    
+    def sampling_tables(self, map_image, over_map_area=False, interpolation=None, tolerance=None):
+        """Get fixed-point tables for map_image, kept in memory for repeated renders."""
+        if map_image.tiled or self._masked:
+            # Tiles are sampled piecewise, and masks read, through float32 tables
+            return self.remap_tables(map_image, over_map_area, tolerance)
+        cache = self._remap_cache
+        nearest = map_image.interpolation_flag(interpolation) == cv.INTER_NEAREST
+        key = cache.key(self._tables_key(map_image, over_map_area, tolerance), 'fixed', nearest)
+        tables = cache.get(key)
+        if tables is None:
+            tables = map_image.fixed_tables(self.remap_tables(map_image, over_map_area, tolerance), interpolation)
+            cache.put(key, tables, disk=False)
+        return tables
+    
+    # Working memory for the sub-pixel points of the regrid weights when no budget is given
+    _regrid_memory = 256 << 20
+    
+    def regrid_weights(self, map_image, over_map_area=False, samples=None, max_memory=None):
+        """Get the sparse weights averaging map_image over the area of each window (or map) pixel.
+        
+        Returns (rows, columns, weights) of the matrix taking the flattened source
+        to the flattened output. Each output pixel is covered by samples x samples
+        points, so a source cell weighs the share of the pixel area that falls in it.
+        The default sample count puts two points per side on every source cell the
+        pixel covers, so no cell is left out of the average however far the source
+        is reduced. Points are worked in bands that fit in max_memory bytes, or a
+        default budget. The weights are computed once per source grid and plan, and
+        kept by the remap cache, memory-mapped from its directory when it has one.
+        """
+        plan = self.plan
+        width, height = plan.map_size if over_map_area else plan.window_size
+        x0, y0 = (0, 0) if over_map_area else plan.window_offset
+        source_height, source_width = map_image.shape[:2]
+        if samples is None:
+            ratio = max(source_width / plan.map_size[0], source_height / plan.map_size[1])
+            samples = max(2, int(np.ceil(2 * ratio)))
+        cache = self._remap_cache
+        key = cache.key(self._tables_key(map_image, over_map_area), 'regrid', samples)
+        weights = cache.get_weights(key)
+        if weights is not None:
+            return weights
+        
+        offsets = (np.arange(samples) + 0.5) / samples - 0.5
+        x = np.arange(x0, x0 + width)[:, np.newaxis] + offsets
+        # Narrow indices keep the cached weights at 12 bytes an entry
+        index = np.int32 if max(width * height, source_width * source_height) < 2 ** 31 else np.int64
+        parts = []
+        for top, bottom in self.bands(width, height, max_memory or self._regrid_memory, bytes_per_pixel=64 * samples * samples):
+            y = np.arange(y0 + top, y0 + bottom)[:, np.newaxis] + offsets
+            # Sub-pixel points laid out as (row, column, v, u)
+            map_x, map_y = map_image.coord_tables(*self.pixel_coords(x[np.newaxis, :, np.newaxis, :], y[:, np.newaxis, :, np.newaxis]))
+            # Sub-pixel points off a mask fall on no source cell
+            inside = np.isfinite(map_x) if self._masked else np.ones(map_x.shape, dtype=bool)
+            if self._masked:
+                map_x[~inside] = map_y[~inside] = 0
+            # Source pixel centres sit on whole table coordinates
+            column = np.floor(map_x + 0.5).astype(np.int64)
+            row = np.floor(map_y + 0.5).astype(np.int64)
+            if map_image.wraps:
+                column %= source_width
+                np.clip(row, 0, source_height - 1, out=row)
+            else:
+                inside &= (column >= 0) & (column < source_width) & (row >= 0) & (row < source_height)
+            pixel = np.arange(top * width, bottom * width).reshape(bottom - top, width, 1, 1)
+            pair = np.broadcast_to(pixel, row.shape)[inside] * (source_width * source_height)
+            pair += row[inside] * source_width + column[inside]
+            pair, hits = np.unique(pair, return_counts=True)
+            pixels, cells = np.divmod(pair, source_width * source_height)
+            # Normalize by the points that fell on the source
+            covered = np.bincount(pixels - top * width, weights=hits, minlength=(bottom - top) * width)
+            parts.append((pixels.astype(index), cells.astype(index), (hits / covered[pixels - top * width]).astype(np.float32)))
+        weights = tuple(np.concatenate(arrays) for arrays in zip(*parts))
+        del parts
+        return cache.put_weights(key, weights)
+    
+    def _region_tables(self, map_image, columns, rows):
+        # Exact tables for a rectangle of window pixels
+        plan = self.plan
+        x0, y0 = plan.window_offset
+        x = np.arange(x0 + columns[0], x0 + columns[1], dtype=plan.dtype)
+        y = np.arange(y0 + rows[0], y0 + rows[1], dtype=plan.dtype)[:, np.newaxis]
+        return map_image.coord_tables(*self.pixel_coords(x, y))
+    
+    def _frame_shift(self, previous):
+        """Pixel shift (dx, dy, wrap) turning the previous frame's plan into the current one, or None."""
+        plan = self.plan
+        moved = ('central_meridian', 'window_offset')
+        if previous.kind != plan.kind:
+            return None
+        if {k: v for k, v in previous.params if k not in moved} != {k: v for k, v in plan.params if k not in moved}:
+            return None
+        dx = plan.window_offset[0] - previous.window_offset[0]
+        dy = plan.window_offset[1] - previous.window_offset[1]
+        wrap = False
+        if plan.central_meridian != previous.central_meridian:
+            # Only cylindrical maps turn a meridian change into a whole-pixel column shift
+            if not self.separable():
+                return None
+            shift = (plan.central_meridian - previous.central_meridian) * plan.scale[0]
+            if abs(shift - round(shift)) > 1e-6:
+                return None
+            dx += int(round(shift))
+            wrap = plan.window_size[0] == plan.map_size[0]
+        return dx, dy, wrap
+    
+    def render_frame(self, map_image, interpolation=None):
+        """Render the window from map_image, reusing the previous frame when the view was only panned or rotated.
+        
+        Meridian shifts of full-width cylindrical windows become a column roll, and
+        pans only compute the strips they expose.
+        """
+        flag = map_image.interpolation_flag(interpolation)
+        source = (id(map_image), map_image.source_key, flag)
+        plan = self.plan
+        width, height = plan.window_size
+        shift = None
+        if self._frame is not None and self._frame[1] == source:
+            shift = self._frame_shift(self._frame[0])
+        if shift is None or abs(shift[1]) >= height or (abs(shift[0]) >= width and not shift[2]):
+            tables = self._compute_tables(map_image)
+            frame = map_image.sample(tables, flag, mask=self._table_mask(tables))
+            self._frame = (plan, source, frame)
+            return frame
+        
+        dx, dy, wrap = shift
+        previous = self._frame[2]
+        if wrap:
+            previous = np.roll(previous, -dx, axis=1)
+            dx = 0
+        # new[y, x] = previous[y + dy, x + dx] wherever that is inside the previous frame
+        left, right = max(0, -dx), min(width, width - dx)
+        top, bottom = max(0, -dy), min(height, height - dy)
+        frame = np.empty_like(previous)
+        frame[top:bottom, left:right] = previous[top + dy:bottom + dy, left + dx:right + dx]
+        exposed = [((0, width), (0, top)), ((0, width), (bottom, height)),
+                   ((0, left), (top, bottom)), ((right, width), (top, bottom))]
+        for columns, rows in exposed:
+            if columns[0] < columns[1] and rows[0] < rows[1]:
+                tables = self._region_tables(map_image, columns, rows)
+                frame[rows[0]:rows[1], columns[0]:columns[1]] = map_image.sample(tables, flag, mask=self._table_mask(tables))
+        self._frame = (plan, source, frame)
+        return frame
+    
+    def project_map(self, map_filename, interpolation=cv.INTER_NEAREST, over_map_area=False, max_memory=None, jobs=None, processes=False, tolerance=None, mipmap=False, source_projection=None, cube_map=False, regrid=False):
+        """Project a source map, given as a file name or a MapImage.
+        
+        Source files are equirectangular unless a source_projection, or its name, is given.
+        With cube_map, sources are first resampled into cube maps, for views centred near a pole.
+        With regrid, data rasters are averaged over each output pixel's area through cached
+        sparse weights instead of point sampled; an integer sets the sub-pixel samples per side.
+        
+        A list of co-registered sources is sampled through one set of remap tables
+        and returned stacked along the channel axis, in their common dtype; a dict
+        of sources returns a dict of layers. Source files in a list or dict keep
+        their channels and bit depth.
+        """
+        layered = isinstance(map_filename, (list, tuple, dict))
+        sources = list(map_filename.values()) if isinstance(map_filename, dict) else list(map_filename) if layered else [map_filename]
+        # Antialiased, area-weighted and cube map sampling need the source in full
+        pixels_per_degree = None if mipmap or regrid or cube_map else self.max_pixels_per_degree()
+        layers = [source if isinstance(source, MapImage) else
+                  MapImage(source, interpolation=interpolation, pixels_per_degree=pixels_per_degree, unchanged=layered or bool(regrid), projection=source_projection)
+                  for source in sources]
+        if cube_map:
+            layers = [layer.cube_map() for layer in layers]
+        map_image = layers[0]
+        if regrid:
+            samples = None if regrid is True else int(regrid)
+            size = self.plan.map_size if over_map_area else self.plan.window_size
+            return self._layer_result(map_filename, [layer.regrid(self.regrid_weights(layer, over_map_area, samples, max_memory), size[::-1])
+                                                     for layer in layers])
+        jobs = max(1, jobs or 1)
+        directory = self._remap_cache.directory
+        if mipmap:
+            # Antialiased sampling from the image pyramid, persisted next to the remap tables
+            for layer in layers:
+                layer.pyramid(directory)
+            self._remap_cache.evict_disk()
+        
+        def sample(layer, tables, dst=None, mask=None):
+            # Float32 tables of the first source, fitted to the layer
+            tables = layer.rescale_tables(tables, map_image)
+            if mipmap:
+                return layer.sample_mipmap(tables, dst=dst, directory=directory, mask=mask)
+            return layer.sample(tables, dst=dst, mask=mask)
+        
+        if not max_memory and jobs == 1:
+            outputs = []
+            tables = self.remap_tables(map_image, over_map_area, tolerance)
+            mask = self._table_mask(tables)
+            for layer in layers:
+                if not mipmap and layer.source_key == map_image.source_key:
+                    outputs.append(layer.sample(self.sampling_tables(layer, over_map_area, tolerance=tolerance), mask=mask))
+                else:
+                    outputs.append(sample(layer, tables, mask=mask))
+            return self._layer_result(map_filename, outputs)
+        
+        # Render the window in horizontal strips into preallocated outputs; the
+        # memory budget is shared by the strips being worked on at the same time
+        width, height = self.plan.map_size if over_map_area else self.plan.window_size
+        outputs = [np.empty((height, width) + layer.shape[2:], dtype=layer.dtype) for layer in layers]
+        cache = self._remap_cache
+        key = self._tables_key(map_image, over_map_area, tolerance)
+        tables = cache.get(key)
+        if tables is not None:
+            stacked = None
+        elif max_memory:
+            stacked = cache.create(key, (height, width))
+        else:
+            stacked = np.empty((2, height, width), dtype=np.float32)
+        strips = self.bands(width, height, max_memory and max_memory // jobs, count=jobs)
+        
+        def render(rows, band=None):
+            y0, y1 = rows
+            if tables is not None:
+                band = (tables[0][y0:y1], tables[1][y0:y1])
+            elif band is None:
+                band = self._compute_tables(map_image, over_map_area, rows, tolerance)
+            if stacked is not None:
+                stacked[0, y0:y1], stacked[1, y0:y1] = band
+            mask = self._table_mask(band)
+            for layer, output in zip(layers, outputs):
+                sample(layer, band, dst=output[y0:y1], mask=mask)
+        
+        if jobs == 1:
+            for rows in strips:
+                render(rows)
+        elif processes and tables is None:
+            # Inverse projection in worker processes, sampling here; the workers get no pixels
+            context = (self.detached(), map_image.geometry(), over_map_area, tolerance)
+            with ProcessPoolExecutor(jobs, initializer=_init_strip_worker, initargs=context) as pool:
+                for rows, band in zip(strips, pool.map(_strip_tables, strips)):
+                    render(rows, band)
+        else:
+            # NumPy ufuncs and cv.remap release the GIL, so threads scale
+            with ThreadPoolExecutor(jobs) as pool:
+                list(pool.map(render, strips))
+        
+        if stacked is not None:
+            if max_memory:
+                cache.commit(key, stacked)
+            else:
+                cache.put(key, (stacked[0], stacked[1]))
+        return self._layer_result(map_filename, outputs)
+    
+    @staticmethod
+    def _layer_result(map_filename, outputs):
+        # Shape the sampled layers the way the sources were given
+        if isinstance(map_filename, dict):
+            return dict(zip(map_filename, outputs))
+        if not isinstance(map_filename, (list, tuple)):
+            return outputs[0]
+        dtype = np.result_type(*outputs)
+        return np.concatenate([output.reshape(output.shape[:2] + (-1,)).astype(dtype, copy=False) for output in outputs], axis=2)
     
     def project_kml(self, kml_filename):
         geo_document = GeoDocument.from_klm(url=kml_filename)
         return geo_document
     
-    def make_raster(self, raster_map, vector_map=None, filename=None):
-        w, h = self.window_size
-        x0, y0 = self.window_offset
+    def make_raster(self, raster_map, vector_map=None, filename=None, max_memory=None):
+        w, h = self.plan.window_size
+        x0, y0 = self.plan.window_offset
         
         # Initialize output image
-        if raster_map:
-            if self.window_size == raster_map.shape[:2]:
+        if raster_map is not None:
+            if (h, w) == raster_map.shape[:2]:
                 output_img = raster_map
             else:
                 output_img = raster_map[y0:y0+h, x0:x0+w, :]
@@ -244,13 +1805,15 @@ class Projection(collector, attributer):
         # Overlay vector map
         if vector_map:
             svg_tree = vector_map.as_svg(projection=self)
-            svg_string = ET.tostring(svg_tree, encoding="unicode")
-            png_bytes = cairosvg.svg2png(bytestring=svg_string)
-            png_image = cv.imdecode(np.frombuffer(png_bytes, np.uint8), cv.IMREAD_COLOR)
-            if self.window_size != png_image.shape[:2]:
+            png_image = SVGbin.from_etree(svg_tree).image_by_cairo()
+            if (h, w) != png_image.shape[:2]:
                 png_image = png_image[y0:y0+h, x0:x0+w, :]
-            alpha = png_image[:, :, 3] / 255.0
-            output_img = cv.addWeighted(output_img, 1 - alpha, png_image[:, :, :3], alpha, 0)
+            # Blend band by band so the float temporaries stay within max_memory
+            output_img = np.array(output_img)
+            for top, bottom in self.bands(w, h, max_memory, bytes_per_pixel=32):
+                alpha = png_image[top:bottom, :, 3:4] / 255.0
+                blended = output_img[top:bottom] * (1 - alpha) + png_image[top:bottom, :, :3] * alpha
+                output_img[top:bottom] = blended.astype(output_img.dtype)
         
         # Save output_img to file if filename is provided
         if filename:
@@ -277,3 +1840,418 @@ class Projection(collector, attributer):
         if filename:
             svg_tree.write(filename)
         return ET.tostring(svg_tree, encoding="unicode")
+
+class AzimuthalProjection(Projection):
+    """Projections onto the plane touching the globe at the central point, drawn as a disk filling the shorter side of the map.
+    
+    Subclasses give the radial law both ways: the factor taking a point's view-frame
+    vector to the plane, and the depth and factor taking a point of the plane back.
+    """
+    _separable = False
+    _masked = True
+    # Radius of the disk in globe radii
+    _rim = 1.0
+    
+    @property
+    def radius(self):
+        """Radius of the disk in pixels."""
+        return min(self.plan.map_size) / 2
+    
+    def max_pixels_per_degree(self):
+        """Map pixels per degree of arc at the centre of the disk.
+        
+        Every azimuthal projection has unit scale at its centre; the orthographic
+        shrinks away from it, the others only stretch along the circles round the
+        centre, and that towards the far rim.
+        """
+        return self.radius / self._rim * np.pi / 180
+    
+    def oblique(self):
+        # Every azimuthal view goes through the rotation
+        return True
+    
+    def _forward(self, cos_c):
+        # Distance on the plane over sin(c), at an angle c from the central point; NaN where nothing is drawn
+        raise NotImplementedError
+    
+    def _inverse(self, rho2):
+        # cos(c) and sin(c) over the distance, at a squared distance rho2 from the centre of the plane
+        raise NotImplementedError
+    
+    def project_xyz(self, xyz, tolerance=None):
+        """Project an (..., 3) array of unit vectors into pixel arrays, NaN where the projection draws nothing."""
+        plan = self.plan
+        # In the view frame the central point is on x, east on z and north on y
+        view = self.to_view(np.asarray(xyz, dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = self._forward(view[..., 0]) * (self.radius / self._rim)
+        x = plan.origin[0] + factor * view[..., 2]
+        y = plan.origin[1] - factor * view[..., 1]
+        return x, y
+    
+    def _disk(self, x, y, dtype=None):
+        # Pixel positions as coordinates on the plane in globe radii, east and north positive
+        plan = self.plan
+        dtype = dtype or plan.dtype
+        scale = self._rim / self.radius
+        u = (np.asarray(x, dtype=dtype) - plan.origin[0]) * scale
+        v = (plan.origin[1] - np.asarray(y, dtype=dtype)) * scale
+        return u.astype(dtype, copy=False), v.astype(dtype, copy=False)
+    
+    def pixel_mask(self, x, y):
+        u, v = self._disk(x, y)
+        return u * u + v * v <= self._rim ** 2
+    
+    def pixel_coords(self, x, y, dtype=None):
+        """Longitude and latitude grids, in degrees, for broadcastable pixel arrays; NaN off the disk."""
+        dtype = dtype or self.plan.dtype
+        u, v = self._disk(x, y, dtype)
+        rho2 = u * u + v * v
+        off = rho2 > self._rim ** 2
+        cos_c, ratio = self._inverse(np.minimum(rho2, self._rim ** 2, out=rho2))
+        view = np.empty((3,) + rho2.shape, dtype=dtype)
+        view[0] = cos_c
+        np.multiply(ratio, v, out=view[1])
+        np.multiply(ratio, u, out=view[2])
+        lon, lat = self.from_view(view)
+        if off.any():
+            lon[off] = lat[off] = np.nan
+        return lon, lat
+
+class Orthographic(AzimuthalProjection):
+    """The globe seen from infinitely far away above the central point."""
+    
+    def _forward(self, cos_c):
+        # The far hemisphere is hidden
+        return np.where(cos_c < 0, np.nan, 1.0)
+    
+    def _inverse(self, rho2):
+        # Lines of sight parallel to the view axis meet the sphere at depth sqrt(1 - rho²)
+        return np.sqrt(1 - rho2), 1.0
+
+class LambertAzimuthal(AzimuthalProjection):
+    """Lambert azimuthal equal-area projection, the whole globe inside a disk of two globe radii."""
+    _rim = 2.0
+    
+    def _forward(self, cos_c):
+        # The antipode spreads over the whole rim
+        return np.where(cos_c > -1, np.sqrt(2 / (1 + cos_c)), np.nan)
+    
+    def _inverse(self, rho2):
+        return 1 - rho2 / 2, np.sqrt(1 - rho2 / 4)
+
+class AzimuthalEquidistant(AzimuthalProjection):
+    """Azimuthal equidistant projection, true to scale along every line through the central point."""
+    _rim = np.pi
+    
+    def _forward(self, cos_c):
+        # c / sin(c), through sinc to stay finite at the centre; the antipode spreads over the whole rim
+        c = np.arccos(np.clip(cos_c, -1, 1))
+        return np.where(c < np.pi, 1 / np.sinc(c / np.pi), np.nan)
+    
+    def _inverse(self, rho2):
+        rho = np.sqrt(rho2)
+        return np.cos(rho), np.sinc(rho / np.pi)
+
+class PseudocylindricalProjection(Projection):
+    """Projections with straight parallels and meridians curving in to the poles, through an auxiliary angle theta.
+    
+    Subclasses give the equation g(theta) = k sin(phi) tying theta to the latitude,
+    with its derivative, and the plane coordinates x = a lambda h(theta) and
+    y = b sin(theta). The map is the largest such outline fitting the map size.
+    """
+    _separable = False
+    _masked = True
+    _k = _a = _b = 1.0
+    # Newton iterations stop below this residual of g(theta) - k sin(phi), or after _newton_steps
+    _newton_tolerance = 1e-12
+    _newton_steps = 50
+    # Most nodes in an auxiliary angle table
+    _max_table = 1 << 20
+    # Auxiliary angle tables by class and node count, shared by instances
+    _theta_tables = {}
+    
+    def _g(self, theta):
+        raise NotImplementedError
+    
+    def _dg(self, theta):
+        raise NotImplementedError
+    
+    def _h(self, theta):
+        raise NotImplementedError
+    
+    def _theta_guess(self, phi):
+        return phi
+    
+    @property
+    def scale(self):
+        """Pixels per unit of the projection plane."""
+        width, height = self.plan.map_size
+        return min(width / (2 * np.pi * self._a * self._h(0.0)), height / (2 * self._b))
+    
+    def max_pixels_per_degree(self):
+        """Map pixels per degree of arc at the centre of the map, along the equator or the central meridian."""
+        # d theta / d phi = k / g'(0) on the equator
+        return self.scale * max(self._a * self._h(0.0), self._b * self._k / self._dg(0.0)) * np.pi / 180
+    
+    def theta(self, phi, tolerance=None):
+        """Auxiliary angle for an array of latitudes in radians.
+        
+        Newton iterations run on the whole array, dropping each element once it
+        converges. Given a tolerance in pixels, theta is interpolated instead from
+        a table fine enough to keep the projected points within it.
+        """
+        phi = np.asarray(phi, dtype=float)
+        if tolerance:
+            # Theta moves a point by at most this many pixels per radian
+            speed = self.scale * max(self._b, np.pi * self._a)
+            nodes = int(min(np.ceil(np.pi * speed / tolerance) + 1, self._max_table))
+            return np.interp(phi, *self._theta_table(nodes))
+        flat = phi.ravel()
+        target = self._k * np.sin(flat)
+        pole = np.abs(flat) >= np.pi / 2
+        theta = np.where(pole, np.copysign(np.pi / 2, flat), self._theta_guess(flat))
+        active = np.flatnonzero(~pole)
+        for _ in range(self._newton_steps):
+            t = theta[active]
+            residual = self._g(t) - target[active]
+            moving = np.abs(residual) > self._newton_tolerance
+            active, t, residual = active[moving], t[moving], residual[moving]
+            if not len(active):
+                break
+            theta[active] = np.clip(t - residual / self._dg(t), -np.pi / 2, np.pi / 2)
+        return theta.reshape(phi.shape)
+    
+    def _theta_table(self, nodes):
+        # Latitudes on a regular theta lattice: g is closed form this way round
+        key = (self.__class__, nodes)
+        if key not in self._theta_tables:
+            theta = np.linspace(-np.pi / 2, np.pi / 2, nodes)
+            phi = np.arcsin(np.clip(self._g(theta) / self._k, -1, 1))
+            self._theta_tables[key] = (phi, theta)
+        return self._theta_tables[key]
+    
+    def _view_to_pixel(self, lon, lat, tolerance=None):
+        plan = self.plan
+        scale = self.scale
+        lam = np.radians((np.asarray(lon) + 180) % 360 - 180)
+        theta = self.theta(np.radians(lat), tolerance)
+        x = plan.origin[0] + (scale * self._a) * lam * self._h(theta)
+        y = plan.origin[1] - (scale * self._b) * np.sin(theta)
+        return x, y
+    
+    def _plane(self, x, y, dtype=None):
+        # Pixel positions as plane coordinates, then theta and longitude in radians; NaN longitudes are off the map
+        plan = self.plan
+        dtype = dtype or plan.dtype
+        scale = self.scale
+        u = ((np.asarray(x, dtype=dtype) - plan.origin[0]) / scale).astype(dtype, copy=False)
+        v = ((plan.origin[1] - np.asarray(y, dtype=dtype)) / scale).astype(dtype, copy=False)
+        sin_theta = v / self._b
+        theta = np.arcsin(np.clip(sin_theta, -1, 1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lam = u / (self._a * self._h(theta))
+        lam[~((np.abs(lam) <= np.pi) & (np.abs(sin_theta) <= 1))] = np.nan
+        return theta, lam
+    
+    def pixel_mask(self, x, y):
+        return ~np.isnan(self._plane(x, y)[1])
+    
+    def pixel_coords(self, x, y, dtype=None):
+        """Longitude and latitude grids, in degrees, for broadcastable pixel arrays; NaN off the map."""
+        dtype = dtype or self.plan.dtype
+        theta, lam = self._plane(x, y, dtype)
+        # Latitude only depends on the row
+        phi = np.arcsin(np.clip(self._g(theta) / self._k, -1, 1)).astype(dtype, copy=False)
+        off = np.isnan(lam)
+        if self.oblique():
+            cos_phi = np.cos(phi)
+            view = np.empty((3,) + lam.shape, dtype=dtype)
+            np.multiply(cos_phi, np.cos(lam), out=view[0])
+            view[1] = np.sin(phi)
+            np.multiply(cos_phi, np.sin(lam), out=view[2])
+            lon, lat = self.from_view(view)
+        else:
+            lon = np.degrees(lam, out=lam)
+            lon += self.plan.central_meridian
+            lat = np.broadcast_to(np.degrees(phi), lon.shape).copy()
+        lon[off] = lat[off] = np.nan
+        return lon, lat
+
+class Mollweide(PseudocylindricalProjection):
+    """Mollweide equal-area projection, the world inside a 2:1 ellipse."""
+    _k = np.pi
+    _a = 2 * np.sqrt(2) / np.pi
+    _b = np.sqrt(2)
+    
+    def _g(self, theta):
+        return 2 * theta + np.sin(2 * theta)
+    
+    def _dg(self, theta):
+        return 2 + 2 * np.cos(2 * theta)
+    
+    def _h(self, theta):
+        return np.cos(theta)
+
+class EckertIV(PseudocylindricalProjection):
+    """Eckert IV equal-area projection, with half-length poles and meridians rounding into them."""
+    _k = 2 + np.pi / 2
+    _a = 2 / np.sqrt(np.pi * (4 + np.pi))
+    _b = 2 * np.sqrt(np.pi / (4 + np.pi))
+    
+    def _g(self, theta):
+        return theta + np.sin(theta) * np.cos(theta) + 2 * np.sin(theta)
+    
+    def _dg(self, theta):
+        return 1 + np.cos(2 * theta) + 2 * np.cos(theta)
+    
+    def _h(self, theta):
+        return 1 + np.cos(theta)
+    
+    def _theta_guess(self, phi):
+        return phi / 2
+
+class InterruptedProjection(Projection):
+    """A base projection cut into lobes, each drawn around its own central meridian, as in Goode's interrupted maps.
+    
+    The base parameter names a registered projection and lobes is a sequence of
+    (west, east, south, north, central) longitude and latitude bounds in degrees,
+    relative to the central meridian. Each lobe sits where the uninterrupted base
+    draws its central meridian; the first lobe containing a point claims it.
+    """
+    _separable = False
+    _masked = True
+    _default_params = {
+        **Projection._default_params,
+        'base': 'mollweide',
+        # Goode's lobes: two over the northern hemisphere, four over the southern
+        'lobes': ((-180.0, -40.0, 0.0, 90.0, -100.0), (-40.0, 180.0, 0.0, 90.0, 30.0),
+                  (-180.0, -100.0, -90.0, 0.0, -160.0), (-100.0, -20.0, -90.0, 0.0, -60.0),
+                  (-20.0, 80.0, -90.0, 0.0, 20.0), (80.0, 180.0, -90.0, 0.0, 140.0)),
+    }
+    # Samples along each lobe edge when bounding it on the map
+    _edge_samples = 65
+    
+    def __init__(self, name=None, **kwargs):
+        self._base = None
+        super().__init__(name, **kwargs)
+    
+    def base(self):
+        """The base projection drawn over this map, in normal aspect and centred on the prime meridian."""
+        plan = self.plan
+        if self._base is None or self._base[0] != plan:
+            base = Projection[plan.param('base')].detached(map_size=plan.map_size, window_size=None, window_offset=(0, 0),
+                                                           central_meridian=0.0, central_latitude=0.0, viewpoint_azimuth=0.0, precision=plan.dtype.name)
+            self._base = (plan, base, self._lobe_layout(base))
+        return self._base[1]
+    
+    def _lobe_layout(self, base):
+        # Per lobe: its bounds, the column shift putting its central meridian in place, and its pixel bounding box
+        layout = []
+        t = np.linspace(0, 1, self._edge_samples)
+        for west, east, south, north, central in self.plan.param('lobes'):
+            shift = np.subtract(*base._view_to_pixel(np.array([central, 0.0]), np.zeros(2))[0])
+            lon = np.concatenate([west + (east - west) * t, np.full_like(t, east), east + (west - east) * t, np.full_like(t, west)])
+            lat = np.concatenate([np.full_like(t, north), north + (south - north) * t, np.full_like(t, south), south + (north - south) * t])
+            x, y = base._view_to_pixel(np.clip(lon - central, -180, 180 - 1e-9), lat)
+            box = (np.nanmin(x) + shift - 1, np.nanmax(x) + shift + 1, np.nanmin(y) - 1, np.nanmax(y) + 1)
+            layout.append(((west, east, south, north, central), shift, box))
+        return layout
+    
+    def max_pixels_per_degree(self):
+        """Lobes draw the base at its own scale."""
+        return self.base().max_pixels_per_degree()
+    
+    @property
+    def lobes(self):
+        """The lobe layout of the current plan: bounds, column shift and pixel bounding box of each lobe."""
+        self.base()
+        return self._base[2]
+    
+    def lobe_index(self, lon, lat):
+        """Index of the lobe holding each point of view-frame longitude and latitude arrays, or -1."""
+        lon, lat = np.broadcast_arrays(np.asarray(lon), np.asarray(lat))
+        index = np.full(lon.shape, -1, dtype=np.int8)
+        for i, ((west, east, south, north, _), _, _) in enumerate(self.lobes):
+            index[(index < 0) & (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)] = i
+        return index
+    
+    def _lobe_pixels(self, lon, lat, tolerance=None):
+        # Each lobe projects its own points through the base, shifted into place
+        lon = (np.asarray(lon, dtype=float) + 180) % 360 - 180
+        lat = np.asarray(lat, dtype=float)
+        lobe = self.lobe_index(lon, lat)
+        x = np.full(lobe.shape, np.nan)
+        y = np.full(lobe.shape, np.nan)
+        base = self.base()
+        for i, ((_, _, _, _, central), shift, _) in enumerate(self.lobes):
+            members = lobe == i
+            if members.any():
+                bx, y[members] = base._view_to_pixel((lon[members] - central + 180) % 360 - 180, lat[members], tolerance)
+                x[members] = bx + shift
+        return x, y, lobe
+    
+    def _view_to_pixel(self, lon, lat, tolerance=None):
+        return self._lobe_pixels(lon, lat, tolerance)[:2]
+    
+    def project_path(self, xyz, tolerance=None):
+        """Project an (N, 3) array of path vertices into pixel arrays, flagging the vertices across a cut from the previous one."""
+        if self.oblique():
+            lon, lat = xyz_to_coord(self.to_view(xyz))
+        else:
+            lon, lat = xyz_to_coord(xyz)
+            lon -= self.plan.central_meridian
+        x, y, lobe = self._lobe_pixels(lon, lat, tolerance)
+        # Consecutive vertices in different lobes straddle a cut
+        return x, y, lobe != np.roll(lobe, 1)
+    
+    def pixel_lobes(self, x, y, dtype=None):
+        """View-frame longitude and latitude grids, in degrees, and the lobe index of broadcastable pixel arrays.
+        
+        Each lobe inverts only the pixels inside its bounding box that no earlier lobe
+        claimed. Pixels in the cuts or off the map get NaN and index -1, which gives
+        the raster mask in the same pass.
+        """
+        dtype = dtype or self.plan.dtype
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=dtype), np.asarray(y, dtype=dtype))
+        shape = x.shape
+        x, y = x.ravel(), y.ravel()
+        lon = np.full(x.shape, np.nan, dtype=dtype)
+        lat = np.full(x.shape, np.nan, dtype=dtype)
+        index = np.full(x.shape, -1, dtype=np.int8)
+        base = self.base()
+        for i, ((west, east, south, north, central), shift, (left, right, top, bottom)) in enumerate(self.lobes):
+            candidates = np.flatnonzero((index < 0) & (x >= left) & (x <= right) & (y >= top) & (y <= bottom))
+            if not len(candidates):
+                continue
+            lobe_lon, lobe_lat = base.pixel_coords(x[candidates] - shift, y[candidates], dtype)
+            inside = (lobe_lon >= west - central) & (lobe_lon <= east - central) & (lobe_lat >= south) & (lobe_lat <= north)
+            members = candidates[inside]
+            lon[members] = lobe_lon[inside] + central
+            lat[members] = lobe_lat[inside]
+            index[members] = i
+        return lon.reshape(shape), lat.reshape(shape), index.reshape(shape)
+    
+    def pixel_mask(self, x, y):
+        return self.pixel_lobes(x, y)[2] >= 0
+    
+    def pixel_coords(self, x, y, dtype=None):
+        """Longitude and latitude grids, in degrees, for broadcastable pixel arrays; NaN in the cuts and off the map."""
+        dtype = dtype or self.plan.dtype
+        lon, lat, index = self.pixel_lobes(x, y, dtype)
+        if not self.oblique():
+            lon += self.plan.central_meridian
+            return lon, lat
+        off = index < 0
+        lon, lat = self.from_view(np.moveaxis(coord_grid_to_xyz(lon, lat), -1, 0))
+        lon[off] = lat[off] = np.nan
+        return lon, lat
+
+# Projections available by name
+Projection('equirectangular')
+Orthographic('orthographic')
+LambertAzimuthal('lambert-azimuthal')
+AzimuthalEquidistant('azimuthal-equidistant')
+Mollweide('mollweide')
+EckertIV('eckert-iv')
+InterruptedProjection('interrupted-mollweide')
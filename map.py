@@ -9,6 +9,7 @@ class MapProgram(PE.Program):
         self.cmd.projection = self.cmd.argument('map projection to use')
         self.cmd.file = self.cmd.group()
         self.cmd.file.map = self.cmd.store_arg('[m]ap-file', 'input raster map file', type=str)
+        self.cmd.file.source = self.cmd.store_arg('map-projection', 'projection of the input raster map', type=str, short=None)
         self.cmd.file.kml = self.cmd.store_arg('[k]ml-file', 'input kml file', type=str)
         self.cmd.file.output = self.cmd.store_arg('[o]utput', 'output raster map file', type=str)
         self.cmd.file.svg = self.cmd.store_arg('[s]vg-file', 'output svg file', type=str)
@@ -21,12 +22,26 @@ class MapProgram(PE.Program):
         self.cmd.formating.size = self.cmd.store_arg('si[z]e', 'output map size', type=PE.arg_size)
         self.cmd.formating.window = self.cmd.store_arg('[w]indow', 'output image window size', type=PE.arg_size)
         self.cmd.formating.shift = self.cmd.store_arg('sh[i]ft', 'output image shift', type=PE.arg_size)
+        self.cmd.performance = self.cmd.group()
+        self.cmd.performance.cache = self.cmd.store_arg('cache-dir', 'remap table cache directory', type=str, short=None)
+        self.cmd.performance.disk = self.cmd.store_arg('cache-size', 'remap table cache directory budget, 4G by default', type=PE.arg_bytes, short=None)
+        self.cmd.performance.tiles = self.cmd.store_arg('tile-cache', 'decoded source tile cache size, e.g. 2G', type=PE.arg_bytes, short=None)
+        self.cmd.performance.memory = self.cmd.store_arg('max-memory', 'working memory budget, e.g. 512M', type=PE.arg_bytes, short=None)
+        self.cmd.performance.jobs = self.cmd.store_arg('[j]obs', 'number of parallel render jobs', type=int)
+        self.cmd.performance.processes = self.cmd.flag('processes', 'run parallel jobs in worker processes', short=None)
+        self.cmd.performance.tolerance = self.cmd.store_arg('[t]olerance', 'coarse-grid sampling tolerance in source pixels', type=float)
+        self.cmd.performance.mipmap = self.cmd.flag('mipmap', 'antialiased sampling from an image pyramid', short=None)
+        self.cmd.performance.regrid = self.cmd.flag('regrid', 'area-weighted resampling for data rasters', short=None)
+        self.cmd.performance.cube = self.cmd.flag('cube-map', 'sample from the map resampled into a cube map', short=None)
         self.cmd.control = self.cmd.group()
         self.cmd.control.verbosity = self.cmd.count_arg('[v]erbose', 'increases verbosity level', auto_exclude=True)
         self.cmd.control.verbosity+= self.cmd.store_arg('[q]uiet', 'quiet mode', const=-1)
         self.cmd.control.debug = self.cmd.flag('debug', 'muestra información de depuración', short=None)
         self.cmd.control.set_version('1.0')
     
+    # Default disk budget of the remap table cache directory
+    _cache_size = 4 << 30
+    
     def findfile(self, name, type='auto'):
         name = name or ''
         answer = None
@@ -45,11 +60,11 @@ class MapProgram(PE.Program):
                             break
             if answer is None:
                 if type == 'auto':
-                    for ext in ('png','PNG','jpg', 'JPG', 'jpeg', 'JPEG', 'kml', 'kmz'):
+                    for ext in ('npy', 'png','PNG','jpg', 'JPG', 'jpeg', 'JPEG', 'kml', 'kmz'):
                         if os.path.isfile(name + '.' + ext):
                             return name + '.' + ext
                 elif type == 'map':
-                    for ext in ('png','PNG','jpg', 'JPG', 'jpeg', 'JPEG'):
+                    for ext in ('npy', 'png','PNG','jpg', 'JPG', 'jpeg', 'JPEG'):
                         if os.path.isfile(name + '.' + ext):
                             return name + '.' + ext
                 elif type == 'kml':
@@ -60,7 +75,8 @@ class MapProgram(PE.Program):
             answer = name
         if not answer:
             return None
-        if not os.path.isfile(answer):
+        # Tiled source maps are directories
+        if not os.path.exists(answer):
             raise FileNotFoundError(f'No se encontró el archivo: {answer}')
         return answer
     
@@ -71,6 +87,10 @@ class MapProgram(PE.Program):
         kml_file = self.findfile(self.arg.kml, 'kml')
         
         projection = Projection[self.arg.projection]
+        if self.arg.cache is not None:
+            Projection.set_remap_cache(self.arg.cache, max_disk_bytes=self.arg.disk or self._cache_size)
+        if self.arg.tiles is not None:
+            MapImage.set_tile_cache(self.arg.tiles)
         
         if map_file is None and kml_file is None and not projection.mapless():
             raise ValueError('No hay archivo de mapas o KML')
@@ -81,14 +101,14 @@ class MapProgram(PE.Program):
         projection.set_window_size(self.arg.window)
         projection.set_window_offset(self.arg.shift)
         
-        raster = projection.project_map(map_file)
-        vector = projection.project_kml(kml_file)
+        raster = projection.project_map(map_file, max_memory=self.arg.memory, jobs=self.arg.jobs, processes=self.arg.processes, tolerance=self.arg.tolerance, mipmap=self.arg.mipmap, source_projection=self.arg.source, cube_map=self.arg.cube, regrid=self.arg.regrid) if map_file else None
+        vector = projection.project_kml(kml_file) if kml_file else None
         
         if self.arg.output is None and self.arg.svg is None and not projection.mapless():
             raise ValueError('No hay archivo de salida')
         
         if self.arg.output is not None:
-            projection.make_raster(raster, vector, self.arg.output)
+            projection.make_raster(raster, vector, self.arg.output, max_memory=self.arg.memory)
         
         if self.arg.svg is not None:
             projection.make_vector(raster, vector, self.arg.svg)
@@ -0,0 +1,35 @@
+import programEngine as PE
+from MapProjection import MapImage
+import os
+
+class MapConvertProgram(PE.Program):
+    def __init__(self, *args, **kwargs):
+        super().__init__('MapConvertProgram')
+        self.cmd.source = self.cmd.argument('source raster map file or tile directory')
+        self.cmd.file = self.cmd.group()
+        self.cmd.file.output = self.cmd.store_arg('[o]utput', 'output .npy file or tile directory', type=str)
+        self.cmd.file.tiles = self.cmd.store_arg('tile-si[z]e', 'cut the source into tiles of this size instead', type=int)
+        self.cmd.control = self.cmd.group()
+        self.cmd.control.verbosity = self.cmd.count_arg('[v]erbose', 'increases verbosity level', auto_exclude=True)
+        self.cmd.control.verbosity+= self.cmd.store_arg('[q]uiet', 'quiet mode', const=-1)
+        self.cmd.control.debug = self.cmd.flag('debug', 'muestra información de depuración', short=None)
+        self.cmd.control.set_version('1.0')
+    
+    def __call__(self, *args, **kwargs):
+        super().__call__(*args, **kwargs)
+        
+        # Data rasters keep their channels and bit depth
+        source = MapImage(self.arg.source, unchanged=True)
+        name = os.path.splitext(self.arg.source.rstrip('/\\'))[0]
+        if self.arg.tiles:
+            output = MapImage.write_tiles(source.mosaic() if source.tiled else source.image, self.arg.output or name + '-tiles', self.arg.tiles)
+        else:
+            output = source.write_raw(self.arg.output or name + '.npy')
+        self.message(output)
+
+        return self
+
+if __name__ == '__main__':
+    from sys import argv
+    main = MapConvertProgram(*argv)
+    main()
@@ -33,6 +33,13 @@ def arg_size(s):
         return int(s), int(s)
     return int(splitted[0]), int(splitted[1])
 
+def arg_bytes(s):
+    units = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', s, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f'invalid size: {s!r}')
+    return int(float(match.group(1)) * units[match.group(2).upper()])
+
 class Program:
     class Arguments(argparse.Namespace):
         pass
@@ -1,7 +1,8 @@
 
 import numpy as np
 import cv2 as cv
-import re
+import re, threading
+from collections import OrderedDict
 
 class ClassPropertyDescriptor(object):
     """
@@ -121,7 +122,7 @@ class collector(object, metaclass=_itemized):
         Args:
             id: The ID of the instance.
         """
-        id = self._set_id(id, what)
+        self._id = self._set_id(id, what)
         super().__init__()
     
     def _set_id(self, id, what=None):
@@ -143,7 +144,7 @@ class collector(object, metaclass=_itemized):
         items[id] = what or self
         return id
     
-    @classmethod
+    @staticmethod
     def simplify_name(name):
         """
         Simplify a name by converting it to lowercase and replacing spaces with hyphens.
@@ -257,9 +258,129 @@ class attributer(object):
             raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
         
     def __setattr__(self, name: str, value) -> None:
-        if name.startswith('_') or name in self.__dict__:
+        # Private names, instance attributes and properties are regular attributes
+        if name.startswith('_') or name in self.__dict__ or isinstance(getattr(type(self), name, None), property):
             super().__setattr__(name, value)
+            return
         if name in self._attributes.keys() or self._valid_key(name):
             self._attributes[name] = value
         else:
             raise AttributeError(f"'{self.__class__.__name__}' object can't assign attribute '{name}'")
+
+
+def nbytes_of(value):
+    """
+    Estimate the memory size of a value, adding up the arrays it contains.
+    
+    Args:
+        value: An array, or a tuple, list or dict of arrays.
+    
+    Returns:
+        int: The size in bytes.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        value = value.values()
+    if isinstance(value, (tuple, list, type({}.values()))):
+        return sum(nbytes_of(item) for item in value)
+    return getattr(value, 'nbytes', 0)
+
+class bytecache(object):
+    """
+    Least-recently-used cache bounded by the total size in bytes of its values.
+    
+    The cache is safe to share between threads.
+    """
+    
+    def __init__(self, max_bytes):
+        """
+        Initialize a bytecache instance.
+        
+        Args:
+            max_bytes (int): Byte budget; least recently used values are evicted beyond it.
+        """
+        self._max_bytes = int(max_bytes)
+        self._items = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+    
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = int(value)
+            self._evict()
+    
+    @property
+    def nbytes(self):
+        return self._nbytes
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def __contains__(self, key):
+        return key in self._items
+    
+    def get(self, key, default=None):
+        """
+        Get a value, marking it as the most recently used.
+        
+        Args:
+            key: The key of the value.
+            default: Value returned when the key is not cached. Defaults to None.
+        
+        Returns:
+            Any: The cached value or the default.
+        """
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key][0]
+    
+    def put(self, key, value, nbytes=None):
+        """
+        Store a value, evicting least recently used values to stay within budget.
+        
+        Values larger than the whole budget are not stored.
+        
+        Args:
+            key: The key of the value.
+            value: The value to store.
+            nbytes (int, optional): Size of the value. Defaults to nbytes_of(value).
+        
+        Returns:
+            bool: True if the value was stored.
+        """
+        nbytes = nbytes_of(value) if nbytes is None else int(nbytes)
+        with self._lock:
+            if key in self._items:
+                self._nbytes -= self._items.pop(key)[1]
+            if nbytes > self._max_bytes:
+                return False
+            self._items[key] = (value, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+            return True
+    
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            value, nbytes = self._items.pop(key)
+            self._nbytes -= nbytes
+            return value
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+    
+    def _evict(self):
+        while self._nbytes > self._max_bytes and self._items:
+            _, (_, nbytes) = self._items.popitem(last=False)
+            self._nbytes -= nbytes